@@ -0,0 +1,167 @@
+# batchSolver.py
+# --------------
+
+
+"""
+Solves many search problems over a pool of worker processes. A problem is
+given as a spec, a dictionary with:
+
+  layout      name of a layout in 'layouts/'
+  start       (x,y) of Pacman; the layout's start if left out
+  goal        (x,y) to reach, for a PositionSearchProblem, or
+  food        list of (x,y) dots to eat, for a FoodSearchProblem
+  fn          search function of search.py [Default: astar]
+  heuristic   heuristic of searchAgents.py or search.py, for searches that
+              take one [Default: nullHeuristic]
+
+Every worker loads a layout the first time one of its specs needs it and
+keeps it, so the walls -- and everything compiled from them, such as the
+layout graph and distance tables -- are shared by all the specs of that
+layout the worker solves. Results stream back as problems finish, in any
+order, as dictionaries with the spec's index and:
+
+  status      ok or error (with 'error', the message)
+  cost        cost of the path found
+  expanded    number of search nodes expanded
+  time        seconds spent in the search
+  actions     the path (only when asked for with includeActions)
+
+Example:
+specs = [{'layout': 'bigMaze', 'start': (35, 1), 'goal': (1, 1), 'fn': 'astar',
+          'heuristic': 'manhattanHeuristic'}, ...]
+for result in solveBatch(specs, processes=4):
+    print result['index'], result['cost'], result['time']
+
+From the command line, with one JSON spec per line:
+python batchSolver.py specs.jsonl -j 4 -o results.jsonl
+"""
+
+import sys, time, json
+import multiprocessing
+
+# Layouts this process has loaded: name -> GameState at the layout's start
+_startStates = {}
+
+def _startState(layoutName):
+    if layoutName not in _startStates:
+        import layout, pacman
+        lay = layout.getLayout(layoutName)
+        if lay == None: raise Exception('The layout ' + layoutName + ' cannot be found')
+        gameState = pacman.GameState()
+        gameState.initialize(lay, 0)
+        _startStates[layoutName] = gameState
+    return _startStates[layoutName]
+
+def makeProblem(spec):
+    "Builds the search problem a spec describes."
+    import pacman, searchAgents
+    from game import Configuration, Directions, Grid
+    gameState = _startState(spec['layout'])
+    start = spec.get('start')
+    if start != None: start = tuple(start)
+    if 'goal' in spec:
+        return searchAgents.PositionSearchProblem(gameState, goal=tuple(spec['goal']), start=start,
+                                                  warn=False, visualize=False)
+    if 'food' in spec:
+        # A shallow copy shares the layout and walls; only food and Pacman change
+        gameState = pacman.GameState(gameState)
+        food = Grid(gameState.data.food.width, gameState.data.food.height)
+        for x, y in spec['food']:
+            food[x][y] = True
+        gameState.data.food = food.asReadOnly()
+        if start != None:
+            gameState.data.agentStates[0].configuration = Configuration(start, Directions.STOP)
+        return searchAgents.FoodSearchProblem(gameState)
+    raise Exception('A spec needs a goal or food: %s' % spec)
+
+def solveSpec(indexedSpec):
+    """
+    Solves one (index, spec) pair and returns its result. Runs in the worker
+    processes; errors are returned as results rather than raised.
+    """
+    index, spec, includeActions = indexedSpec
+    import search, searchAgents
+    result = {'index': index, 'layout': spec['layout']}
+    try:
+        problem = makeProblem(spec)
+        func = getattr(search, spec.get('fn', 'astar'))
+        args = [problem]
+        if 'heuristic' in func.func_code.co_varnames[:func.func_code.co_argcount]:
+            name = spec.get('heuristic', 'nullHeuristic')
+            if name in dir(searchAgents):
+                args.append(getattr(searchAgents, name))
+            else:
+                args.append(getattr(search, name))
+        start = time.time()
+        actions = func(*args)
+        result['time'] = time.time() - start
+        result['status'] = 'ok'
+        result['cost'] = problem.getCostOfActions(actions)
+        result['expanded'] = problem._expanded
+        if includeActions: result['actions'] = actions
+    except Exception, e:
+        result['status'] = 'error'
+        result['error'] = '%s: %s' % (e.__class__.__name__, e)
+    return result
+
+def solveBatch(specs, processes=None, includeActions=False, chunksize=None):
+    """
+    Solves every spec on a pool of 'processes' workers (one per core by
+    default) and yields the results as they finish. With processes=1 the
+    specs are solved in this process, in order.
+
+    Specs are handed to workers 'chunksize' at a time; by default about 16
+    chunks per worker, few enough that passing them around costs little and
+    enough that a worker stuck on hard problems does not hold up the rest.
+    """
+    work = [(index, spec, includeActions) for index, spec in enumerate(specs)]
+    if processes == 1:
+        for item in work:
+            yield solveSpec(item)
+        return
+    if processes == None: processes = multiprocessing.cpu_count()
+    if chunksize == None: chunksize = max(1, len(work) // (processes * 16))
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(solveSpec, work, chunksize):
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python batchSolver.py <options> <specs file>
+    EXAMPLES:   (1) python batchSolver.py specs.jsonl -j 4 -o results.jsonl
+                    - solves every spec (one JSON object per line) on 4 processes
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-j', '--processes', dest='processes', type='int', default=None,
+                      help='Number of worker processes [Default: one per core]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write results to this file (JSON lines) instead of stdout')
+    parser.add_option('--actions', dest='includeActions', action='store_true', default=False,
+                      help='Include the actions of each path in the results')
+    parser.add_option('--chunksize', dest='chunksize', type='int', default=None,
+                      help='Specs handed to a worker at a time [Default: about 16 chunks per worker]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 1:
+        parser.error('Expected one specs file, got: ' + str(otherjunk))
+    return options, otherjunk[0]
+
+if __name__ == '__main__':
+    options, specsPath = readCommand(sys.argv[1:])
+    specs = [json.loads(line) for line in open(specsPath) if line.strip()]
+    output = open(options.output, 'w') if options.output else sys.stdout
+    start = time.time()
+    solved = 0
+    for result in solveBatch(specs, options.processes, options.includeActions, options.chunksize):
+        output.write(json.dumps(result, sort_keys=True) + '\n')
+        output.flush()
+        solved += result['status'] == 'ok'
+    if output is not sys.stdout: output.close()
+    print >>sys.stderr, 'Solved %d of %d problems in %.2f seconds' % (solved, len(specs), time.time() - start)
@@ -0,0 +1,310 @@
+# benchmark.py
+# ------------
+
+
+"""
+Runs the searches of search.py over the layouts in 'layouts/' and records,
+for every (layout, problem, search, heuristic) case:
+
+  status      ok, timeout, memory (ran out of --memory) or error
+  cost        cost of the returned path
+  expanded    number of search nodes expanded (problem._expanded)
+  time        wall time of the search in seconds
+  rss         peak resident memory of the process in kilobytes
+
+Problems are picked by what a layout contains:
+  PositionSearchProblem,  layouts with a single food dot (the dot is the goal)
+  ContractedPositionSearchProblem
+  CornersProblem          layouts with food in all four corners
+  FoodSearchProblem       every layout with food
+
+and are searched with bfs, dfs, ucs and astar (with manhattanHeuristic,
+cornersHeuristic or foodHeuristic). Every case runs in its own process, so
+peak memory is per case and a case that blows up is cut off by --timeout.
+
+Examples:
+python benchmark.py --json baseline.json
+python benchmark.py -l mediumMaze,trickySearch --csv results.csv
+python benchmark.py --json new.json --baseline baseline.json
+
+With --baseline, cases that got slower, expanded more nodes, used more memory
+or found a worse path than in the baseline are reported and the exit code is 1.
+Note that foodHeuristic fills the distance table cache (see distanceTable.py)
+on its first run, so compare runs with a warm cache.
+"""
+
+import os, sys, time, json, csv, glob, subprocess, tempfile
+
+SEARCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAYOUT_DIR = os.path.join(SEARCH_DIR, 'layouts')
+
+# (problem, heuristic used with astar) pairs, each run with every search in SEARCHES
+PROBLEMS = [
+    ('PositionSearchProblem', 'manhattanHeuristic'),
+    ('ContractedPositionSearchProblem', 'manhattanHeuristic'),
+    ('CornersProblem', 'cornersHeuristic'),
+    ('FoodSearchProblem', 'foodHeuristic'),
+]
+SEARCHES = ['bfs', 'dfs', 'ucs', 'astar']
+
+FIELDS = ['layout', 'problem', 'fn', 'heuristic', 'status', 'cost', 'expanded', 'time', 'rss']
+KEY_FIELDS = ('layout', 'problem', 'fn', 'heuristic')
+
+def caseKey(result):
+    return tuple(result[field] for field in KEY_FIELDS)
+
+############################
+# Choosing what to run     #
+############################
+
+def layoutNames():
+    return sorted(os.path.basename(path)[:-4] for path in glob.glob(os.path.join(LAYOUT_DIR, '*.lay')))
+
+def applicableProblems(lay):
+    "Returns the problems that make sense for a layout.Layout."
+    food = lay.food.asList()
+    top, right = lay.height - 2, lay.width - 2
+    problems = []
+    if len(food) == 1:
+        problems += ['PositionSearchProblem', 'ContractedPositionSearchProblem']
+    if all(lay.food[x][y] for x, y in ((1,1), (1,top), (right,1), (right,top))):
+        problems.append('CornersProblem')
+    if len(food) > 0:
+        problems.append('FoodSearchProblem')
+    return problems
+
+def listCases(layouts, problems, searches):
+    import layout
+    heuristics = dict(PROBLEMS)
+    cases = []
+    for name in layouts:
+        lay = layout.getLayout(name)
+        if lay == None: raise Exception('The layout ' + name + ' cannot be found')
+        for problem in applicableProblems(lay):
+            if problem not in problems: continue
+            for fn in searches:
+                heuristic = heuristics[problem] if fn == 'astar' else ''
+                cases.append({'layout': name, 'problem': problem, 'fn': fn, 'heuristic': heuristic})
+    return cases
+
+############################
+# Running a single case    #
+############################
+
+def runCase(case, maxMemory=None):
+    """
+    Runs one case in this process and returns its result. Meant to be called
+    in a fresh process (see runCaseInProcess), so rss only covers this case.
+    """
+    import resource
+    if maxMemory != None:
+        limit = maxMemory * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    import layout, pacman, search, searchAgents
+    result = dict(case)
+    gameState = pacman.GameState()
+    gameState.initialize(layout.getLayout(case['layout']), 0)
+    problemType = getattr(searchAgents, case['problem'])
+    if case['problem'] in ('PositionSearchProblem', 'ContractedPositionSearchProblem'):
+        goal = gameState.getFood().asList()[0]
+        problem = problemType(gameState, goal=goal, warn=False, visualize=False)
+    else:
+        problem = problemType(gameState)
+    func = getattr(search, case['fn'])
+
+    # Searches and problems print progress, keep it out of the results
+    realStdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        try:
+            start = time.time()
+            if case['heuristic']:
+                path = func(problem, getattr(searchAgents, case['heuristic']))
+            else:
+                path = func(problem)
+            result['time'] = time.time() - start
+            result['status'] = 'ok'
+            result['cost'] = problem.getCostOfActions(path)
+            result['expanded'] = problem._expanded
+        except MemoryError:
+            result['status'] = 'memory'
+    finally:
+        sys.stdout.close()
+        sys.stdout = realStdout
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin': rss /= 1024 # bytes there, kilobytes on linux
+    result['rss'] = rss
+    return result
+
+def runCaseInProcess(case, timeout, maxMemory):
+    "Runs a case in a child process, killing it after timeout seconds."
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', json.dumps(case)]
+    if maxMemory != None:
+        command += ['--memory', str(maxMemory)]
+    output, errors = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+    try:
+        process = subprocess.Popen(command, cwd=SEARCH_DIR, stdout=output, stderr=errors)
+        deadline = time.time() + timeout
+        while process.poll() == None:
+            if time.time() > deadline:
+                process.kill()
+                process.wait()
+                result = dict(case)
+                result['status'] = 'timeout'
+                return result
+            time.sleep(0.01)
+        output.seek(0)
+        errors.seek(0)
+        lines = output.read().strip().splitlines()
+        if process.returncode == 0 and lines:
+            return json.loads(lines[-1])
+        result = dict(case)
+        message = errors.read()
+        result['status'] = 'memory' if 'MemoryError' in message else 'error'
+        if result['status'] == 'error':
+            print >>sys.stderr, message
+        return result
+    finally:
+        output.close()
+        errors.close()
+
+############################
+# Results                  #
+############################
+
+def writeJson(results, path):
+    f = open(path, 'w')
+    try:
+        json.dump(results, f, indent=1, sort_keys=True)
+        f.write('\n')
+    finally:
+        f.close()
+
+def writeCsv(results, path):
+    f = open(path, 'wb')
+    try:
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+    finally:
+        f.close()
+
+def readResults(path):
+    "Reads results written by writeJson or writeCsv."
+    f = open(path, 'rb')
+    try:
+        if not path.endswith('.csv'):
+            return json.load(f)
+        results = []
+        for row in csv.DictReader(f):
+            for field, convert in (('cost', int), ('expanded', int), ('time', float), ('rss', int)):
+                row[field] = convert(row[field]) if row.get(field) else None
+            results.append(row)
+        return results
+    finally:
+        f.close()
+
+def formatResult(result):
+    name = '%s %s %s %s' % (result['layout'], result['problem'], result['fn'], result['heuristic'])
+    if result['status'] != 'ok':
+        return '%-60s %s' % (name, result['status'])
+    return '%-60s cost=%5d expanded=%8d time=%8.3fs rss=%7dKB' % \
+           (name, result['cost'], result['expanded'], result['time'], result['rss'])
+
+def compareResults(results, baseline, tolerance=0.2, minTime=0.05):
+    """
+    Returns a list of (result, message) for every case that regressed against
+    the baseline. Time and memory may grow by 'tolerance' (a fraction) before
+    they count; times below minTime seconds are too noisy to compare.
+    """
+    baseline = dict( (caseKey(old), old) for old in baseline )
+    regressions = []
+    for new in results:
+        old = baseline.get(caseKey(new))
+        if old == None or old['status'] != 'ok': continue
+        if new['status'] != 'ok':
+            regressions.append((new, 'status %s (was ok)' % new['status']))
+            continue
+        if new['cost'] > old['cost']:
+            regressions.append((new, 'cost %d (was %d)' % (new['cost'], old['cost'])))
+        if new['expanded'] > old['expanded']:
+            regressions.append((new, 'expanded %d (was %d)' % (new['expanded'], old['expanded'])))
+        if new['time'] > max(old['time'] * (1 + tolerance), minTime):
+            regressions.append((new, 'time %.3fs (was %.3fs)' % (new['time'], old['time'])))
+        if new['rss'] > old['rss'] * (1 + tolerance):
+            regressions.append((new, 'rss %dKB (was %dKB)' % (new['rss'], old['rss'])))
+    return regressions
+
+############################
+# Command line             #
+############################
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python benchmark.py <options>
+    EXAMPLES:   (1) python benchmark.py --json baseline.json
+                    - runs every case and saves the results
+                (2) python benchmark.py -l mediumMaze -f bfs,astar --baseline baseline.json
+                    - reruns some cases and reports regressions
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layouts', dest='layouts', default=None,
+                      help='Comma separated layouts to run (default: all in layouts/)')
+    parser.add_option('-p', '--problems', dest='problems', default=','.join(p for p, h in PROBLEMS),
+                      help='Comma separated problems to run [Default: %default]')
+    parser.add_option('-f', '--searches', dest='searches', default=','.join(SEARCHES),
+                      help='Comma separated searches to run [Default: %default]')
+    parser.add_option('-t', '--timeout', dest='timeout', type='float', default=30,
+                      help='Seconds a single case may take [Default: %default]')
+    parser.add_option('-m', '--memory', dest='memory', type='int', default=2048,
+                      help='Megabytes of memory a single case may use [Default: %default]')
+    parser.add_option('--json', dest='jsonPath', default=None,
+                      help='Write the results to this JSON file')
+    parser.add_option('--csv', dest='csvPath', default=None,
+                      help='Write the results to this CSV file')
+    parser.add_option('-b', '--baseline', dest='baseline', default=None,
+                      help='Results (JSON or CSV) to compare against')
+    parser.add_option('--tolerance', dest='tolerance', type='float', default=0.2,
+                      help='Allowed relative growth of time and memory [Default: %default]')
+    parser.add_option('--run-case', dest='runCase', default=None,
+                      help='(internal) Run a single case given as JSON and print its result')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+def main(argv):
+    options = readCommand(argv)
+    if options.runCase != None:
+        print json.dumps(runCase(json.loads(options.runCase), options.memory))
+        return 0
+
+    layouts = options.layouts.split(',') if options.layouts else layoutNames()
+    cases = listCases(layouts, options.problems.split(','), options.searches.split(','))
+    results = []
+    for case in cases:
+        result = runCaseInProcess(case, options.timeout, options.memory)
+        print formatResult(result)
+        sys.stdout.flush()
+        results.append(result)
+
+    if options.jsonPath: writeJson(results, options.jsonPath)
+    if options.csvPath: writeCsv(results, options.csvPath)
+
+    if options.baseline:
+        regressions = compareResults(results, readResults(options.baseline), options.tolerance)
+        print
+        if not regressions:
+            print 'No regressions against %s' % options.baseline
+            return 0
+        print '%d regressions against %s:' % (len(regressions), options.baseline)
+        for result, message in regressions:
+            print '  %s %s %s %s: %s' % (result['layout'], result['problem'], result['fn'], result['heuristic'], message)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
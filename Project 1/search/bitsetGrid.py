@@ -0,0 +1,132 @@
+# bitsetGrid.py
+# -------------
+
+
+"""
+This file contains a BitsetGrid object, the open cells of a layout as the bits
+of one Python integer, for breadth first searches that expand a whole
+frontier at once instead of one node at a time.
+
+Cell (x,y) is bit x * stride + y, where stride = height + 1: every column has
+one spare bit above it, so moving NORTH or SOUTH is a shift by one bit and
+moving EAST or WEST a shift by stride bits, and masking with the open cells
+drops the moves into walls or off the grid. One BFS level is then
+
+  nextFrontier = (frontier << 1 | frontier >> 1 | frontier << stride |
+                  frontier >> stride) & open & ~reached
+
+which Python runs word by word over the whole grid.
+
+Example:
+grid = getBitsetGrid(gameState.getWalls())
+levels = grid.levels([(1,1)], goal=(10,10))
+actions = grid.pathTo(levels, (10,10))
+distances = grid.distances([(1,1)])   # indexed like layoutGraph cell ids
+"""
+
+from array import array
+from game import Directions, bitPositions
+from layoutGraph import getLayoutGraph, WallsCache, NO_PATH
+
+class BitsetGrid:
+    """
+    The open cells of a layout as a bitmap. Built once per set of walls (see
+    getBitsetGrid) and never changed.
+    """
+    def __init__(self, walls):
+        self.walls = walls
+        self.width = walls.width
+        self.height = walls.height
+        self.stride = walls.height + 1
+        self.open = 0
+        for x, y in walls.asList(False):
+            self.open |= self.getBit((x, y))
+        self.numCells = bin(self.open).count('1')
+        # Ways a cell is entered, to walk a path back: (action, shift back
+        # to the cell it came from, as (left shift, right shift))
+        self._backMoves = [(Directions.NORTH, 0, 1), (Directions.SOUTH, 1, 0),
+                           (Directions.EAST, 0, self.stride), (Directions.WEST, self.stride, 0)]
+
+    def getBit(self, position):
+        x, y = position
+        return 1 << (x * self.stride + y)
+
+    def getPositions(self, cells):
+        "Returns the (x,y) of every bit set in cells, by increasing bit."
+        # Columns of stride bits, the spare bits are never set
+        return bitPositions(cells, self.stride)
+
+    def expand(self, cells):
+        "Returns the open cells one move away from any of the given cells."
+        stride = self.stride
+        return (cells << 1 | cells >> 1 | cells << stride | cells >> stride) & self.open
+
+    def levels(self, sources, goal=None):
+        """
+        Runs a breadth first search from 'sources' (a list of positions) and
+        returns its levels: levels[d] has the bits of the cells at distance d.
+        If 'goal' (a position, or a bitmask of goal cells) is given, stops at
+        the first level that reaches it.
+        """
+        frontier = 0
+        for source in sources:
+            frontier |= self.getBit(source)
+        frontier &= self.open
+        if goal == None:
+            goalBits = 0
+        elif isinstance(goal, tuple):
+            goalBits = self.getBit(goal)
+        else:
+            goalBits = goal
+        reached, levels = frontier, []
+        while frontier:
+            levels.append(frontier)
+            if frontier & goalBits: break
+            frontier = self.expand(frontier) & ~reached
+            reached |= frontier
+        return levels
+
+    def pathTo(self, levels, position):
+        """
+        Returns the actions from a source to position along the levels of a
+        search that reached it, or None if it was not reached.
+        """
+        cell = self.getBit(position)
+        for depth in range(len(levels)):
+            if levels[depth] & cell: break
+        else:
+            return None
+        actions = []
+        for depth in range(depth - 1, -1, -1):
+            previousLevel = levels[depth]
+            for action, left, right in self._backMoves:
+                previous = (cell << left) >> right
+                if previous & previousLevel:
+                    actions.append(action)
+                    cell = previous
+                    break
+        actions.reverse()
+        return actions
+
+    def distances(self, sources):
+        """
+        Returns the distance from the nearest of 'sources' to every open cell,
+        as layoutGraph.shortestDistances does: an array indexed by the cell
+        ids of the layout graph, NO_PATH for unreachable cells.
+        """
+        graph = getLayoutGraph(self.walls)
+        distances = array('i', [NO_PATH]) * graph.numCells
+        cellIds, height = graph.cellIds, self.height
+        for depth, level in enumerate(self.levels(sources)):
+            for x, y in self.getPositions(level):
+                distances[cellIds[x * height + y]] = depth
+        return distances
+
+_grids = WallsCache(BitsetGrid)
+
+def getBitsetGrid(walls):
+    """
+    Returns the BitsetGrid of the given walls Grid, shared by all callers in
+    this process.
+    """
+    return _grids.get(walls)
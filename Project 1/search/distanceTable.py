@@ -0,0 +1,147 @@
+# distanceTable.py
+# ----------------
+
+
+"""
+This file contains a DistanceTable object which holds the maze distance
+between every pair of open cells of a layout. The table is computed once per
+set of walls, stored as a flat array of 16-bit integers (cell i to cell j is
+entry i * numCells + j) and saved to a cache file in 'distanceCache/' next to
+'layouts/'. Later runs memory-map that file instead of recomputing it.
+
+Example:
+table = getDistanceTable(gameState.getWalls())
+table.getDistance( (1,1), (10,10) )
+
+Open cells are numbered in the order of walls.asList(False), so the same walls
+always give the same cell ids.
+"""
+
+import os, sys, struct, hashlib
+import util
+from array import array
+from layoutGraph import getLayoutGraph
+
+# Stored for pairs of cells that are not connected
+UNREACHABLE = 0xFFFF
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'distanceCache')
+
+_HEADER = struct.Struct('<4sIII') # magic, width, height, number of open cells
+_MAGIC = 'PDT1'
+
+# In-process tables: walls digest -> DistanceTable
+_tables = {}
+# (walls, table) of the last lookup, which skips hashing the walls again
+_last = (None, None)
+
+class DistanceTable:
+    """
+    All-pairs maze distances over the open cells of a layout. Queries are two
+    dictionary lookups and one array access.
+    """
+    def __init__(self, walls, cells, distances):
+        self.width = walls.width
+        self.height = walls.height
+        self.cells = cells
+        self.cellIndex = dict( (cell, i) for i, cell in enumerate(cells) )
+        self.numCells = len(cells)
+        # Either an array('H') or a memory-mapped cache file
+        self._distances = distances
+        if isinstance(distances, array):
+            self._at = distances.__getitem__
+        else:
+            offset, unpack = _HEADER.size, struct.Struct('<H').unpack_from
+            self._at = lambda i: unpack(distances, offset + 2 * i)[0]
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open cells, or UNREACHABLE if
+        there is no path between them.
+        """
+        return self._at(self.cellIndex[pos1] * self.numCells + self.cellIndex[pos2])
+
+    def getDistanceBetweenCells(self, i, j):
+        "Same as getDistance, but takes cell ids (indices into self.cells)."
+        return self._at(i * self.numCells + j)
+
+    def getDistancesFrom(self, pos):
+        "Returns a dictionary (cell -> maze distance from pos) of reachable cells."
+        row = self.cellIndex[pos] * self.numCells
+        distances = {}
+        for j, cell in enumerate(self.cells):
+            d = self._at(row + j)
+            if d != UNREACHABLE:
+                distances[cell] = d
+        return distances
+
+def getDistanceTable(walls, useCache=True):
+    """
+    Returns the DistanceTable for the given walls Grid. Tables are shared
+    inside the process and, if useCache is set, persisted on disk.
+    """
+    global _last
+    if _last[0] is walls:
+        return _last[1]
+    key = wallsDigest(walls)
+    if key in _tables:
+        _last = (walls, _tables[key])
+        return _tables[key]
+    cells = walls.asList(False)
+    table = None
+    path = os.path.join(CACHE_DIR, key + '.dist')
+    if useCache:
+        table = _loadTable(path, walls, cells)
+    if table == None:
+        table = DistanceTable(walls, cells, computeDistances(walls, cells))
+        if useCache:
+            _saveTable(path, table)
+    _tables[key] = table
+    _last = (walls, table)
+    return table
+
+def wallsDigest(walls):
+    "A key for the walls that is stable across runs and machines."
+    return hashlib.sha1('%d %d\n%s' % (walls.width, walls.height, str(walls))).hexdigest()[:20]
+
+def computeDistances(walls, cells):
+    """
+    Runs a breadth first search from every open cell. Returns the flat
+    array('H') of distances.
+    """
+    numCells = len(cells)
+    if numCells >= UNREACHABLE: raise Exception('Layout too big for a distance table')
+    # Cell ids of the layout graph are the same as ours (walls.asList(False))
+    graph = getLayoutGraph(walls)
+    neighbors = [graph.targets[graph.offsets[i]:graph.offsets[i + 1]] for i in range(numCells)]
+
+    distances = array('H', [UNREACHABLE]) * (numCells * numCells)
+    for source in range(numCells):
+        row = source * numCells
+        distances[row + source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for cell in frontier:
+                for other in neighbors[cell]:
+                    if distances[row + other] == UNREACHABLE:
+                        distances[row + other] = depth
+                        nextFrontier.append(other)
+            frontier = nextFrontier
+    return distances
+
+def _loadTable(path, walls, cells):
+    numCells = len(cells)
+    mapped = util.mapCacheFile(path, _HEADER, (_MAGIC, walls.width, walls.height, numCells),
+                               _HEADER.size + 2 * numCells * numCells)
+    if mapped == None: return None
+    return DistanceTable(walls, cells, mapped)
+
+def _saveTable(path, table):
+    data = table._distances
+    if sys.byteorder != 'little':
+        data = array('H', data)
+        data.byteswap()
+    util.saveCacheFile(path, _HEADER, (_MAGIC, table.width, table.height, table.numCells), data)
@@ -14,6 +14,9 @@
 
 import search
 import random
+import sys
+import time
+from patternDatabase import getPatternDatabases
 
 # Module Classes
 
@@ -196,7 +199,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -262,7 +265,146 @@ def createRandomEightPuzzle(moves=100):
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+def puzzleNumbers(puzzle):
+    "Returns the numbers an EightPuzzleState was built from, row by row."
+    return [number for row in puzzle.cells for number in row]
+
+def _blankMoves(size):
+    "Returns, for every cell of the blank, the legal (move, cell moved to) pairs."
+    moves = []
+    for cell in range(size * size):
+        row, col = divmod(cell, size)
+        legal = []
+        if row != 0: legal.append(('up', cell - size))
+        if row != size - 1: legal.append(('down', cell + size))
+        if col != 0: legal.append(('left', cell - 1))
+        if col != size - 1: legal.append(('right', cell + 1))
+        moves.append(legal)
+    return moves
+
+def encodePuzzle(numbers):
+    """
+    Packs a puzzle (numbers row by row, 0 for the blank) into one integer:
+    4 bits per cell holding its tile, with the cell of the blank above them.
+    """
+    state = 0
+    for cell, number in enumerate(numbers):
+        state |= number << (4 * cell)
+    return state | (list(numbers).index(0) << (4 * len(numbers)))
+
+def decodePuzzle(state, size=3):
+    "Returns the numbers, row by row, of a state made by encodePuzzle."
+    return [(state >> (4 * cell)) & 15 for cell in range(size * size)]
+
+class SlidingPuzzleSearchProblem(search.SearchProblem):
+    """
+      The eight puzzle (size 3) or fifteen puzzle (size 4) as a search
+    problem whose states are single integers (see encodePuzzle), so a move is
+    a few bit operations and hashing a state is hashing an int. Actions are
+    the same as EightPuzzleState's: 'up', 'down', 'left' and 'right'.
+
+    Use patternDatabaseHeuristic with A* for the fifteen puzzle; without it
+    the search space is far too big.
+    """
+    def __init__(self, numbers, size=3):
+        "numbers: the puzzle row by row (e.g. puzzleNumbers(puzzle)), 0 for the blank"
+        self.size = size
+        self.numCells = size * size
+        self.start = encodePuzzle(numbers)
+        self.goal = encodePuzzle(range(self.numCells))
+        self.blankShift = 4 * self.numCells
+        self.tileMask = (1 << self.blankShift) - 1
+        self.blankMoves = _blankMoves(size)
+        self._expanded = 0
+        self.heuristicInfo = {} # A dictionary for the heuristic to store information
+
+    def getStartState(self):
+        return self.start
+
+    def isGoalState(self, state):
+        return state == self.goal
+
+    def getSuccessors(self, state):
+        "Returns (successor, move, 1) triples in the order of legalMoves."
+        self._expanded += 1
+        blank = state >> self.blankShift
+        tiles = state & self.tileMask
+        successors = []
+        for move, cell in self.blankMoves[blank]:
+            # The tile on 'cell' slides onto the blank
+            tile = (tiles >> (4 * cell)) & 15
+            nextTiles = tiles - (tile << (4 * cell)) + (tile << (4 * blank))
+            successors.append( (nextTiles | (cell << self.blankShift), move, 1) )
+        return successors
+
+    def getCostOfActions(self, actions):
+        return len(actions)
+
+def patternDatabaseHeuristic(state, problem):
+    """
+      The sum of the additive pattern databases (see patternDatabase.py) of
+    the puzzle's size, for SlidingPuzzleSearchProblem. The databases are
+    loaded, or built the first time, on the first call.
+    """
+    info = problem.heuristicInfo
+    if 'databases' not in info:
+        info['databases'] = getPatternDatabases(problem.size)
+    cellOf = [0] * problem.numCells
+    for cell in range(problem.numCells):
+        cellOf[(state >> (4 * cell)) & 15] = cell
+    return sum(database.getCost([cellOf[tile] for tile in database.tiles])
+               for database in info['databases'])
+
+def createRandomSlidingPuzzle(size=3, moves=100):
+    """
+      Like createRandomEightPuzzle, for a puzzle of any size. Returns the
+    numbers of the puzzle row by row.
+    """
+    blankMoves = _blankMoves(size)
+    numbers = range(size * size)
+    blank = 0
+    for i in range(moves):
+        move, cell = random.choice(blankMoves[blank])
+        numbers[blank], numbers[cell] = numbers[cell], 0
+        blank = cell
+    return numbers
+
+def solvePuzzles(puzzles, size=3, searchFunction=search.aStarSearch, heuristic=patternDatabaseHeuristic):
+    """
+      Solves many puzzles (EightPuzzleStates or lists of numbers) on compact
+    states; the pattern databases are loaded once for all of them. Returns a
+    list of (path, nodes expanded) pairs.
+    """
+    results = []
+    for puzzle in puzzles:
+        if isinstance(puzzle, EightPuzzleState): puzzle = puzzleNumbers(puzzle)
+        problem = SlidingPuzzleSearchProblem(puzzle, size)
+        path = searchFunction(problem, heuristic)
+        results.append( (path, problem._expanded) )
+    return results
+
+def runBatch(count, size=3, moves=100):
+    "Solves 'count' random puzzles and prints a summary."
+    if size == 3:
+        puzzles = [createRandomEightPuzzle(moves) for i in range(count)]
+    else:
+        puzzles = [createRandomSlidingPuzzle(size, moves) for i in range(count)]
+    start = time.time()
+    getPatternDatabases(size)
+    print('Pattern databases ready in %.2f seconds' % (time.time() - start))
+    start = time.time()
+    results = solvePuzzles(puzzles, size)
+    elapsed = time.time() - start
+    print('Solved %d puzzles in %.2f seconds: %.1f moves and %.0f nodes expanded on average' %
+          (count, elapsed, sum(len(path) for path, expanded in results) / float(count),
+           sum(expanded for path, expanded in results) / float(count)))
+
 if __name__ == '__main__':
+    # python eightpuzzle.py --batch <count> [<size> [<moves>]] solves random puzzles
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        runBatch(*[int(arg) for arg in sys.argv[2:5]])
+        sys.exit(0)
+
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
     print(puzzle)
@@ -0,0 +1,322 @@
+# layoutGraph.py
+# --------------
+
+
+"""
+This file contains a LayoutGraph object, the walls of a layout compiled once
+into a graph over its open cells:
+
+  cells              cell id -> (x,y), ids are numbered 0..N-1 in the order
+                     of walls.asList(False)
+  cellIndex          (x,y) -> cell id
+  getCellId(x, y)    the same through a flat array, -1 for walls
+  offsets, targets,  the moves out of cell i are targets[k] / actions[k] for
+  actions            offsets[i] <= k < offsets[i+1] (compressed sparse rows)
+
+Moves of a cell are listed in the order NORTH, SOUTH, EAST, WEST that the
+search problems in searchAgents.py generate successors in, so a problem that
+opts into the graph expands states in the same order as before. For problems
+whose states hold (x,y) positions the graph also keeps ready-made lists:
+
+  getMoves((x,y))          [((nextx, nexty), action), ...]
+  getReverseMoves((x,y))   [((prevx, prevy), action), ...] where action leads
+                           from (prevx, prevy) to (x,y)
+
+Example:
+graph = getLayoutGraph(gameState.getWalls())
+for nextPosition, action in graph.getMoves( (1,1) ): ...
+
+shortestDistances gives distances from one cell, or from the nearest of many,
+to all cells as an array indexed by cell id, and pathTo rebuilds a path from
+it on demand.
+
+ContractedGraph collapses the corridors of a layout graph into weighted edges
+between junctions, for searches on mazes (see ContractedPositionSearchProblem
+in searchAgents.py).
+"""
+
+from array import array
+from game import Directions, Actions
+
+# Successor order of the search problems
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+class LayoutGraph:
+    """
+    The open cells of a layout and the moves between them. Built once per
+    set of walls (see getLayoutGraph) and never changed.
+    """
+    def __init__(self, walls):
+        self.width = walls.width
+        self.height = walls.height
+        self.cells = walls.asList(False)
+        self.cellIndex = dict( (cell, i) for i, cell in enumerate(self.cells) )
+        self.numCells = len(self.cells)
+        # Cell id of (x,y) is cellIds[x * height + y]
+        self.cellIds = array('i', [-1]) * (self.width * self.height)
+        for i, (x, y) in enumerate(self.cells):
+            self.cellIds[x * self.height + y] = i
+
+        vectors = [(action, Actions.directionToVector(action)) for action in ACTIONS]
+        self._vectors = [(action, int(dx), int(dy)) for action, (dx, dy) in vectors]
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        self.actions = []
+        self._moves = {}
+        self._reverseMoves = {}
+        for x, y in self.cells:
+            moves, reverseMoves = [], []
+            for action, (dx, dy) in vectors:
+                dx, dy = int(dx), int(dy)
+                nextCell = self._cellId(x + dx, y + dy)
+                if nextCell >= 0:
+                    self.targets.append(nextCell)
+                    self.actions.append(action)
+                    moves.append( ((x + dx, y + dy), action) )
+                if self._cellId(x - dx, y - dy) >= 0:
+                    reverseMoves.append( ((x - dx, y - dy), action) )
+            self.offsets.append(len(self.targets))
+            self._moves[(x, y)] = moves
+            self._reverseMoves[(x, y)] = reverseMoves
+
+    def _cellId(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cellIds[x * self.height + y]
+        return -1
+
+    def getCellId(self, x, y):
+        "Returns the id of the open cell (x,y), or -1 for walls."
+        return self.cellIds[x * self.height + y]
+
+    def getCell(self, cellId):
+        return self.cells[cellId]
+
+    def getNeighbors(self, cellId):
+        "Returns the (neighbor id, action) pairs of a cell."
+        start, end = self.offsets[cellId], self.offsets[cellId + 1]
+        return zip(self.targets[start:end], self.actions[start:end])
+
+    def getMoves(self, position):
+        """
+        Returns the ((x,y), action) pairs reachable in one move from position.
+        A position that is not an open cell (e.g. a start inside a wall) gets
+        the moves into the open cells next to it, as walls[x][y] would give.
+        """
+        try:
+            return self._moves[position]
+        except KeyError:
+            return self._movesAt(position, 1)
+
+    def getReverseMoves(self, position):
+        "Returns the ((x,y), action) pairs from which action reaches position."
+        try:
+            return self._reverseMoves[position]
+        except KeyError:
+            return self._movesAt(position, -1)
+
+    def _movesAt(self, position, sign):
+        # Moves of any position, computed rather than looked up
+        x, y = position
+        moves = []
+        for action, dx, dy in self._vectors:
+            nextx, nexty = int(x + sign * dx), int(y + sign * dy)
+            if self._cellId(nextx, nexty) >= 0:
+                moves.append( ((nextx, nexty), action) )
+        return moves
+
+class WallsCache:
+    """
+    Objects built from a set of walls by build(walls), once per set of walls
+    and shared by all callers in this process. Walls are looked up by their
+    contents, except that the read-only walls of the last lookup (e.g. those
+    of a layout) are recognized as the same object.
+    """
+    def __init__(self, build):
+        self.build = build
+        # All objects built: (width, height, walls as text) -> object
+        self.built = {}
+        # (walls, object) of the last lookup of read-only walls, which skips
+        # the dictionary lookup (walls that can change in place never do)
+        self.last = (None, None)
+
+    def get(self, walls):
+        if self.last[0] is walls:
+            return self.last[1]
+        key = (walls.width, walls.height, str(walls))
+        if key not in self.built:
+            self.built[key] = self.build(walls)
+        if walls.isReadOnly():
+            self.last = (walls, self.built[key])
+        return self.built[key]
+
+_graphs = WallsCache(LayoutGraph)
+
+def getLayoutGraph(walls):
+    """
+    Returns the LayoutGraph of the given walls Grid, shared by all callers in
+    this process.
+    """
+    return _graphs.get(walls)
+
+class ContractedGraph:
+    """
+    The layout graph with its dead ends removed and its corridors collapsed.
+
+    Dead ends that contain no kept cell can never be part of a shortest path
+    between kept cells and are dropped. What is left is split into junctions
+    -- cells without exactly two neighbors, kept cells (e.g. start, goal or
+    food) and one cell of every cycle that has no other junction -- and
+    corridors of two-neighbor cells between them. Every corridor becomes an
+    edge; shortest paths between junctions are the same as in the full graph.
+
+    edges[position] lists the edges out of a junction as
+    (nextJunction, actions, cells) where 'actions' walks the corridor and
+    'cells' are the cells it enters, ending with nextJunction.
+    """
+    def __init__(self, graph, keep=()):
+        offsets, targets, actions = graph.offsets, graph.targets, graph.actions
+        numCells = graph.numCells
+        keepIds = set(graph.cellIndex[cell] for cell in keep if cell in graph.cellIndex)
+
+        # Peel dead ends until every remaining cell has two neighbors or is kept
+        degree = [offsets[i + 1] - offsets[i] for i in range(numCells)]
+        removed = bytearray(numCells)
+        deadEnds = [i for i in range(numCells) if degree[i] <= 1 and i not in keepIds]
+        while deadEnds:
+            cell = deadEnds.pop()
+            if removed[cell]: continue
+            removed[cell] = 1
+            for k in range(offsets[cell], offsets[cell + 1]):
+                other = targets[k]
+                if not removed[other]:
+                    degree[other] -= 1
+                    if degree[other] <= 1 and other not in keepIds:
+                        deadEnds.append(other)
+
+        isJunction = bytearray(numCells)
+        for i in range(numCells):
+            if not removed[i] and (degree[i] != 2 or i in keepIds):
+                isJunction[i] = 1
+        covered = bytearray(numCells)
+        self.edges = {}
+
+        def walkCorridors(junction):
+            edges = []
+            for k in range(offsets[junction], offsets[junction + 1]):
+                previous, cell = junction, targets[k]
+                if removed[cell]: continue
+                path, cells = [actions[k]], [cell]
+                while not isJunction[cell]:
+                    covered[cell] = 1
+                    for m in range(offsets[cell], offsets[cell + 1]):
+                        nextCell = targets[m]
+                        if nextCell != previous and not removed[nextCell]:
+                            break
+                    previous, cell = cell, nextCell
+                    path.append(actions[m])
+                    cells.append(cell)
+                if cell != junction:
+                    edges.append( (graph.cells[cell], tuple(path), [graph.cells[i] for i in cells]) )
+            self.edges[graph.cells[junction]] = edges
+
+        for i in range(numCells):
+            if isJunction[i]:
+                walkCorridors(i)
+        # Cycles of two-neighbor cells are not reached from any junction
+        for i in range(numCells):
+            if not removed[i] and not isJunction[i] and not covered[i]:
+                isJunction[i] = 1
+                walkCorridors(i)
+        self.junctions = self.edges.keys()
+        self.numRemoved = sum(removed)
+
+    def getEdges(self, position):
+        "Returns the (nextJunction, actions, cells) edges out of a junction."
+        return self.edges[position]
+
+# Distance of cells that cannot be reached from any source
+NO_PATH = -1
+
+def shortestDistances(graph, sources, costFn=None, withPredecessors=False):
+    """
+    Returns the distance from the nearest of 'sources' (a list of positions)
+    to every open cell, in one pass: an array indexed by cell id, NO_PATH for
+    unreachable cells. With one source these are plain single-source
+    distances; with many, e.g. all the food, the distance to the nearest one.
+
+    Moves cost 1 (breadth first search, an array of ints) unless costFn is
+    given, which like PositionSearchProblem's is charged for each cell entered
+    (Dijkstra, an array of floats).
+
+    With withPredecessors, returns (distances, predecessors) where
+    predecessors[i] is the cell id before cell i on a shortest path, or -1 for
+    sources and unreachable cells. Paths are rebuilt on demand by pathTo.
+    """
+    numCells = graph.numCells
+    offsets, targets = graph.offsets, graph.targets
+    predecessors = array('i', [-1]) * numCells if withPredecessors else None
+    sourceIds = [graph.cellIndex[source] for source in sources]
+
+    if costFn == None:
+        distances = array('i', [NO_PATH]) * numCells
+        frontier = []
+        for source in sourceIds:
+            if distances[source] == NO_PATH:
+                distances[source] = 0
+                frontier.append(source)
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for cell in frontier:
+                for k in xrange(offsets[cell], offsets[cell + 1]):
+                    other = targets[k]
+                    if distances[other] == NO_PATH:
+                        distances[other] = depth
+                        if predecessors is not None: predecessors[other] = cell
+                        nextFrontier.append(other)
+            frontier = nextFrontier
+    else:
+        import heapq
+        distances = array('d', [NO_PATH]) * numCells
+        entryCosts = [costFn(cell) for cell in graph.cells]
+        fringe = [(0, source) for source in sourceIds]
+        heapq.heapify(fringe)
+        done = bytearray(numCells)
+        while fringe:
+            cost, cell = heapq.heappop(fringe)
+            if done[cell]: continue
+            done[cell] = 1
+            distances[cell] = cost
+            for k in xrange(offsets[cell], offsets[cell + 1]):
+                other = targets[k]
+                if done[other]: continue
+                otherCost = cost + entryCosts[other]
+                if distances[other] == NO_PATH or otherCost < distances[other]:
+                    # Tentative until popped; the final value is set on pop
+                    distances[other] = otherCost
+                    if predecessors is not None: predecessors[other] = cell
+                    heapq.heappush(fringe, (otherCost, other))
+
+    if withPredecessors:
+        return distances, predecessors
+    return distances
+
+def pathTo(graph, distances, predecessors, position):
+    """
+    Returns the actions from the source nearest to position to position,
+    given the result of shortestDistances(..., withPredecessors=True), or None
+    if it cannot be reached.
+    """
+    cell = graph.cellIndex[position]
+    if distances[cell] == NO_PATH: return None
+    actions = []
+    while predecessors[cell] != -1:
+        previous = predecessors[cell]
+        for k in xrange(graph.offsets[previous], graph.offsets[previous + 1]):
+            if graph.targets[k] == cell:
+                actions.append(graph.actions[k])
+                break
+        cell = previous
+    actions.reverse()
+    return actions
@@ -0,0 +1,159 @@
+# patternDatabase.py
+# ------------------
+
+
+"""
+This file contains additive pattern databases for the sliding puzzles of
+eightpuzzle.py (the eight puzzle, size 3, and the fifteen puzzle, size 4).
+
+A pattern database for a group of tiles stores, for every placement of those
+tiles, the least number of moves of those tiles needed to bring them home,
+ignoring all other tiles. Moves of the blank that do not move a tile of the
+group are free, so the databases of disjoint groups can be added up and the
+sum is still an admissible (and consistent) heuristic.
+
+Databases are built by a 0-1 breadth first search backwards from the goal,
+indexed by the rank of the tile placement (see rankPlacement) and stored as
+one byte per placement in 'patternCache/' next to this file. Later runs
+memory-map that file instead of building it again.
+
+Example:
+databases = getPatternDatabases(3)
+sum(db.getCost(tilePositions) for db in databases)
+"""
+
+import os, struct
+import util
+from collections import deque
+
+# Disjoint tile groups used by default. The fifteen puzzle uses groups of
+# four, whose databases take about twenty seconds to build the first time
+# (groups of five would take many minutes)
+DEFAULT_GROUPS = {
+    3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+    4: [(1, 2, 3, 4), (5, 6, 7, 8), (9, 10, 11, 12), (13, 14, 15)],
+}
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patternCache')
+
+_HEADER = struct.Struct('<4sII') # magic, puzzle size, number of entries
+_MAGIC = 'PPD1'
+
+# In-process databases: (size, tiles) -> PatternDatabase
+_databases = {}
+
+def numPlacements(numCells, numItems):
+    "Number of ways to place numItems distinct items on numCells cells."
+    count = 1
+    for i in range(numItems):
+        count *= numCells - i
+    return count
+
+def rankPlacement(cells, numCells):
+    """
+    Ranks a placement of distinct items (item i on cells[i]) among all
+    numPlacements(numCells, len(cells)) placements, as a mixed radix number
+    whose i-th digit is the rank of cells[i] among the cells still free.
+    """
+    rank, used = 0, 0
+    for i, cell in enumerate(cells):
+        smallerFree = cell - bin(used & ((1 << cell) - 1)).count('1')
+        rank = rank * (numCells - i) + smallerFree
+        used |= 1 << cell
+    return rank
+
+class PatternDatabase:
+    """
+    Costs of one group of tiles. getCost takes the cells of the group's tiles,
+    in the order of self.tiles.
+    """
+    def __init__(self, size, tiles, costs):
+        self.size = size
+        self.tiles = tiles
+        self.numCells = size * size
+        # Either a bytearray or a memory-mapped cache file
+        self._costs = costs
+        if isinstance(costs, bytearray):
+            self._at = costs.__getitem__
+        else:
+            offset = _HEADER.size
+            self._at = lambda i: ord(costs[offset + i])
+
+    def getCost(self, cells):
+        return self._at(rankPlacement(cells, self.numCells))
+
+def getPatternDatabases(size, groups=None, useCache=True):
+    """
+    Returns the additive pattern databases of the puzzle of the given size,
+    one per group of tiles (DEFAULT_GROUPS unless given).
+    """
+    if groups == None: groups = DEFAULT_GROUPS[size]
+    return [getPatternDatabase(size, tuple(tiles), useCache) for tiles in groups]
+
+def getPatternDatabase(size, tiles, useCache=True):
+    key = (size, tiles)
+    if key in _databases:
+        return _databases[key]
+    path = os.path.join(CACHE_DIR, '%d-%s.pdb' % (size, '_'.join(str(tile) for tile in tiles)))
+    database = None
+    if useCache:
+        database = _loadDatabase(path, size, tiles)
+    if database == None:
+        database = PatternDatabase(size, tiles, buildCosts(size, tiles))
+        if useCache:
+            _saveDatabase(path, database)
+    _databases[key] = database
+    return database
+
+def buildCosts(size, tiles):
+    """
+    Runs a 0-1 breadth first search from the goal over (cells of the tiles,
+    cell of the blank). Moving the blank onto a tile of the group costs 1,
+    other moves are free. Returns a bytearray of costs indexed by the rank of
+    the tiles' cells.
+    """
+    numCells = size * size
+    numTiles = len(tiles)
+    neighbors = []
+    for cell in range(numCells):
+        row, col = divmod(cell, size)
+        adjacent = []
+        if row > 0: adjacent.append(cell - size)
+        if row < size - 1: adjacent.append(cell + size)
+        if col > 0: adjacent.append(cell - 1)
+        if col < size - 1: adjacent.append(cell + 1)
+        neighbors.append(adjacent)
+
+    unknown = 255
+    costs = bytearray([unknown]) * numPlacements(numCells, numTiles)
+    settled = bytearray(numPlacements(numCells, numTiles + 1))
+    # In the goal tile t is on cell t and the blank on cell 0
+    start = tuple(tiles) + (0,)
+    fringe = deque([(start, 0)])
+    while fringe:
+        placement, cost = fringe.popleft()
+        rank = rankPlacement(placement, numCells)
+        if settled[rank]: continue
+        settled[rank] = 1
+        tileRank = rankPlacement(placement[:numTiles], numCells)
+        if costs[tileRank] == unknown:
+            costs[tileRank] = cost
+        blank = placement[numTiles]
+        for cell in neighbors[blank]:
+            if cell in placement:
+                # The tile on 'cell' slides onto the blank
+                tile = placement.index(cell)
+                nextPlacement = placement[:tile] + (blank,) + placement[tile + 1:numTiles] + (cell,)
+                fringe.append((nextPlacement, cost + 1))
+            else:
+                fringe.appendleft((placement[:numTiles] + (cell,), cost))
+    return costs
+
+def _loadDatabase(path, size, tiles):
+    numEntries = numPlacements(size * size, len(tiles))
+    mapped = util.mapCacheFile(path, _HEADER, (_MAGIC, size, numEntries), _HEADER.size + numEntries)
+    if mapped == None: return None
+    return PatternDatabase(size, tiles, mapped)
+
+def _saveDatabase(path, database):
+    util.saveCacheFile(path, _HEADER, (_MAGIC, database.size, len(database._costs)), database._costs)
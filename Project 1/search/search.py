@@ -18,6 +18,7 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import searchStats
 
 class SearchProblem:
     """
@@ -80,13 +81,15 @@ def depthFirstSearch(problem):
     goal. Make sure to implement a graph search algorithm.
     """
     # Passing 'stack' to be used as fringe for generic search will result in dfs algorithm.
-    return genericSearch(problem, fringe = Stack(), useCost = False)
+    return genericSearch(problem, fringe = Stack(), useCost = False,
+                         stats = searchStats.newRecord('dfs', problem))
 
 def breadthFirstSearch(problem):
     from util import Queue
     """Search the shallowest nodes in the search tree first."""
     # Using 'queue' as a fringe will lead to breadth-first traversal.
-    return genericSearch(problem, fringe = Queue(), useCost = False) 
+    return genericSearch(problem, fringe = Queue(), useCost = False,
+                         stats = searchStats.newRecord('bfs', problem))
 
 def uniformCostSearch(problem):
     from util import PriorityQueueWithFunction as pq
@@ -94,7 +97,8 @@ def uniformCostSearch(problem):
     # 'Priority queue' alongside with cost will work for weighted graphs as ucs
     # Function is passed to compare 'state' items by the cumulative cost from start to the state.
     func = lambda node: node.getCost() 
-    return genericSearch(problem, fringe = pq(func), useCost = True) 
+    return genericSearch(problem, fringe = pq(func), useCost = True,
+                         stats = searchStats.newRecord('ucs', problem))
 
 def nullHeuristic(state, problem=None):
     """
@@ -109,76 +113,697 @@ def aStarSearch(problem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost and heuristic first."""
     # This time function estimates cost as price from start to current node +
     # heuristical belief of cost from current to the goal state
+    stats = searchStats.newRecord('astar', problem)
+    if stats is not None:
+        heuristic = stats.timeHeuristic(heuristic)
     func = lambda node: node.getCost() + heuristic(node.getState(), problem)
-    return genericSearch(problem, fringe = pq(func), useCost = True)
+    return genericSearch(problem, fringe = pq(func), useCost = True, stats = stats)
 
 def dijkstraWithAllPaths(problem):
     from util import PriorityQueueWithFunction as pq
-    """Same as ucs, but with paths to all states traversed, not just 'goal'."""
+    """
+    Same as ucs, but with paths to all states traversed, not just 'goal'.
+    On a layout, layoutGraph.shortestDistances gives all the distances as one
+    array instead, with paths rebuilt only when asked for (layoutGraph.pathTo).
+    """
     func = lambda node: node.getCost()
     # the format is (dirs to goal, dict of (some state -> dirs to that state from start)
     return genericSearch(problem, fringe = pq(func), useCost = True, allStates = True)
 
-# Searches state spaces using different traversals determined by type of 'fringe'
-# If allStates is True, function will store pathes to all states not just 'goal'
-def genericSearch(problem, fringe, useCost, allStates = False):
-    
-    # Inner class for conveniently storing search nodes
-    class Node():
-        def __init__(self, directions, state, cumulativeCost = None):
-            self.directions = directions
-            self.state = state
-            if cumulativeCost != None:
-                self.cumulativeCost = cumulativeCost
+def uniformCostSearchIndexed(problem):
+    """
+    Same as ucs, but every state sits in the fringe at most once: finding a
+    cheaper path to an open state lowers its priority instead of pushing a
+    duplicate entry.
+    """
+    return indexedBestFirstSearch(problem, nullHeuristic)
+
+def aStarSearchIndexed(problem, heuristic=nullHeuristic):
+    "Same as astar, but on an indexed fringe with decrease-key (see above)."
+    return indexedBestFirstSearch(problem, heuristic)
+
+class SearchNode(object):
+    """
+    A node of the search tree. Instead of carrying a copy of the whole path,
+    every node keeps a reference to its parent and the action that led to it,
+    so pushing a child is O(1). The path is rebuilt only when it is needed
+    (i.e. once the goal is found).
+    """
+    __slots__ = ('state', 'parent', 'action', 'cumulativeCost')
 
-        getDirections = lambda self: self.directions
-        getState      = lambda self: self.state
-        getCost       = lambda self: self.cumulativeCost
+    def __init__(self, state, parent = None, action = None, cumulativeCost = 0):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cumulativeCost = cumulativeCost
 
+    getState = lambda self: self.state
+    getCost  = lambda self: self.cumulativeCost
+
+    def getDirections(self):
+        "Walks parent pointers back to the root and returns the actions in order."
+        directions = []
+        node = self
+        while node.parent is not None:
+            directions.append(node.action)
+            node = node.parent
+        directions.reverse()
+        return directions
+
+def pathsFromNodes(nodes):
+    """
+    Turns a dictionary of (state -> search node) into (state -> directions).
+    Each path is built from its parent's one, which is already computed, so
+    the whole thing is linear in the size of the output.
+    """
+    paths = {}
+    def directionsOf(node):
+        # Iterative on the chain of not yet resolved ancestors (no deep recursion)
+        chain = []
+        while node.parent is not None and node.state not in paths:
+            chain.append(node)
+            node = node.parent
+        dirs = paths.get(node.state, [])
+        for link in reversed(chain):
+            dirs = dirs + [link.action]
+            paths[link.state] = dirs
+        return dirs
+    for state, node in nodes.items():
+        if state not in paths:
+            paths[state] = directionsOf(node)
+    return paths
+
+# Searches state spaces using different traversals determined by type of 'fringe'
+# If allStates is True, function will store pathes to all states not just 'goal'
+# If stats is given (see searchStats.py), the run is counted and timed into it
+def genericSearch(problem, fringe, useCost, allStates = False, stats = None):
     """
     Generic graph traversal. Depending on the fringe search will be performed
     in a particular way (dfs, bfs, A*, ucs)
     """
-    # Initialize fringe with single start state, if cost is to be considered add arg
-    startNodeArg = ( [], problem.getStartState() )
-    if useCost: startNodeArg += (0,)
-    # Asterisk unpacks arguments
-    fringe.push( Node(*startNodeArg) ) # add new node to the fringe with provided args
+    searchProblem = problem
+    if stats is not None:
+        searchProblem, fringe = stats.wrapProblem(problem), stats.wrapFringe(fringe)
+    # Initialize fringe with single start state (root node has no parent)
+    fringe.push( SearchNode(searchProblem.getStartState()) )
     # Set to store already considered coords
     traversedStates = set()
-    # Store (state -> cost to get there from start state) in dictionary
+    # Store (state -> node it was reached with), paths are rebuilt at the end
     if allStates:
-        paths = {}
+        nodes = {}
+    dirs = [] # Cant reach the goal state, better stay where you are
 
     # Do the following: extract states from fringe
     # and process them until either goal is found
     # of fringe becomes empty
     while not fringe.isEmpty():
-        # Extract next 'State' object which stores directions, coord and optionally cost 
+        # Extract next node which stores state, parent link, last action and cost
         curNode = fringe.pop()
         curState = curNode.getState()
         # If we already came across this one move to next iteration
         if curState in traversedStates:
+            if stats is not None: stats.duplicatePops += 1
             continue
         traversedStates.add(curState)
         # Store in the dictionary
         if allStates:
-            paths[curState] = curNode.getDirections()
+            nodes[curState] = curNode
         # Yayy, we found it
-        if problem.isGoalState(curState):
+        if searchProblem.isGoalState(curState):
             dirs = curNode.getDirections()
-            return dirs if not allStates else (dirs, paths)
+            break
         # Extend fringe with new visible states
-        for successor in problem.getSuccessors(curState):
+        curCost = curNode.getCost()
+        for successor in searchProblem.getSuccessors(curState):
             nextState, directionToMove, price = successor    # price is used only if flag is on
-            nextNodeArg = ( curNode.getDirections()[:] + [directionToMove], nextState ) # [:] deep copy
-            if useCost: nextNodeArg += (curNode.getCost() + price,)
-            fringe.push( Node(*nextNodeArg) ) 
+            # Child only references its parent, no path copying
+            nextCost = curCost + price if useCost else 0
+            fringe.push( SearchNode(nextState, curNode, directionToMove, nextCost) )
+
+    if stats is not None:
+        stats.finish(problem, dirs)
+    return dirs if not allStates else (dirs, pathsFromNodes(nodes))
+
+# Best-first search (ucs/A*) on a fringe keyed by state. Unlike genericSearch,
+# which lets duplicates pile up and skips them when popped, here the size of
+# the fringe is bounded by the number of distinct open states. Nodes are
+# popped in the same order as in genericSearch, so paths and expansions match.
+def indexedBestFirstSearch(problem, heuristic):
+    from util import IndexedPriorityQueue
+    startState = problem.getStartState()
+    fringe = IndexedPriorityQueue()
+    fringe.push(startState, heuristic(startState, problem))
+    # open state -> best node found so far for it
+    openNodes = { startState: SearchNode(startState) }
+    traversedStates = set()
+
+    while not fringe.isEmpty():
+        curState = fringe.pop()
+        curNode = openNodes.pop(curState)
+        traversedStates.add(curState)
+        if problem.isGoalState(curState):
+            return curNode.getDirections()
+        curCost = curNode.getCost()
+        for nextState, directionToMove, price in problem.getSuccessors(curState):
+            if nextState in traversedStates:
+                continue
+            nextCost = curCost + price
+            # Keep the older entry on ties, as the FIFO order would pop it first anyway
+            openNode = openNodes.get(nextState)
+            if openNode is not None and openNode.getCost() <= nextCost:
+                continue
+            openNodes[nextState] = SearchNode(nextState, curNode, directionToMove, nextCost)
+            fringe.update(nextState, nextCost + heuristic(nextState, problem))
+
+    return [] # Cant reach the goal state
+
+def bidirectionalSearch(problem):
+    """
+    Bidirectional uniform cost search (breadth-first for unit costs) for
+    problems with a single goal. The problem must also provide getGoalState()
+    and getPredecessors(state), which returns triples (predecessor, action,
+    stepCost) with 'action' leading from the predecessor to 'state'.
+
+    One fringe grows from the start, one from the goal, always expanding the
+    cheaper of the two. Every edge joining the two searched regions is a
+    candidate path; the search stops once the two fringe minima add up to no
+    less than the best candidate, which is then optimal. For a distance d
+    this expands about two disks of radius d/2 instead of one of radius d.
+    """
+    import heapq
+    startState = problem.getStartState()
+    if problem.isGoalState(startState):
+        return []
+    goalState = problem.getGoalState()
+
+    # Backward nodes point towards the goal: 'action' moves from the node's
+    # state to its parent's state.
+    sides = [
+        { 'best': { startState: SearchNode(startState) }, 'closed': set(),
+          'fringe': [(0, 0, SearchNode(startState))], 'expand': problem.getSuccessors },
+        { 'best': { goalState: SearchNode(goalState) }, 'closed': set(),
+          'fringe': [(0, 1, SearchNode(goalState))], 'expand': problem.getPredecessors },
+    ]
+    count = 2
+    bestCost, meeting = None, None
+
+    while sides[0]['fringe'] and sides[1]['fringe']:
+        topCosts = (sides[0]['fringe'][0][0], sides[1]['fringe'][0][0])
+        if bestCost != None and topCosts[0] + topCosts[1] >= bestCost:
+            break
+        direction = 0 if topCosts[0] <= topCosts[1] else 1
+        side, other = sides[direction], sides[1 - direction]
+        curNode = heapq.heappop(side['fringe'])[2]
+        curState = curNode.getState()
+        if curState in side['closed']:
+            continue
+        side['closed'].add(curState)
+        curCost = curNode.getCost()
+        for nextState, action, price in side['expand'](curState):
+            if nextState in side['closed']:
+                continue
+            nextCost = curCost + price
+            nextNode = side['best'].get(nextState)
+            if nextNode is None or nextCost < nextNode.getCost():
+                nextNode = SearchNode(nextState, curNode, action, nextCost)
+                side['best'][nextState] = nextNode
+                heapq.heappush(side['fringe'], (nextCost, count, nextNode))
+                count += 1
+            # Did the two searches touch?
+            otherNode = other['best'].get(nextState)
+            if otherNode is not None:
+                total = nextNode.getCost() + otherNode.getCost()
+                if bestCost == None or total < bestCost:
+                    bestCost = total
+                    meeting = (nextNode, otherNode) if direction == 0 else (otherNode, nextNode)
+
+    if meeting == None:
+        return [] # Cant reach the goal state
+    forwardNode, backwardNode = meeting
+    directions = forwardNode.getDirections()
+    while backwardNode.parent is not None:
+        directions.append(backwardNode.action)
+        backwardNode = backwardNode.parent
+    return directions
+
+def idaStarSearch(problem, heuristic=nullHeuristic):
+    """
+    Iterative deepening A*. Runs depth-first searches bounded by
+    f = cost + heuristic, raising the bound to the smallest f that exceeded it
+    until a goal is found. Memory is linear in the depth of the solution: only
+    the current path is kept (cycles along it are skipped), no closed set and
+    no fringe. The price is re-expanding states, across iterations and when
+    they are reachable by several paths.
+    """
+    startState = problem.getStartState()
+    bound = heuristic(startState, problem)
+    while True:
+        nextBound = None
+        # Current path as frames [state, cost, iterator over successors]
+        frames = [[startState, 0, None]]
+        onPath = set([startState])
+        actions = []
+        while frames:
+            frame = frames[-1]
+            state, cost, successors = frame
+            if successors is None:
+                f = cost + heuristic(state, problem)
+                if f <= bound:
+                    if problem.isGoalState(state):
+                        return actions
+                    frame[2] = iter(problem.getSuccessors(state))
+                    continue
+                # Over the bound: remember the smallest such f for the next iteration
+                if nextBound == None or f < nextBound:
+                    nextBound = f
+            else:
+                deeper = False
+                for nextState, directionToMove, price in successors:
+                    if nextState not in onPath:
+                        frames.append([nextState, cost + price, None])
+                        onPath.add(nextState)
+                        actions.append(directionToMove)
+                        deeper = True
+                        break
+                if deeper: continue
+            # Backtrack from this frame
+            frames.pop()
+            onPath.discard(state)
+            if frames: actions.pop()
+        if nextBound == None:
+            return [] # Cant reach the goal state
+        bound = nextBound
+
+class _BoundedNode(SearchNode):
+    "A node of the search tree kept in memory by smaStarSearch."
+    __slots__ = ('depth', 'f', 'index', 'successors', 'nextIndex', 'children',
+                 'forgotten', 'queued', 'version')
+
+    def __init__(self, state, parent, action, cumulativeCost, depth, f, index):
+        SearchNode.__init__(self, state, parent, action, cumulativeCost)
+        self.depth = depth
+        self.f = f
+        self.index = index       # position among the parent's successors
+        self.successors = None   # problem.getSuccessors(state), on first expansion
+        self.nextIndex = 0       # next successor to generate
+        self.children = []       # generated successors still in memory
+        self.forgotten = {}      # successor index -> f of deleted successors
+        self.queued = False
+        self.version = 0
+
+def smaStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000, maxSteps=None):
+    """
+    Simplified memory-bounded A* (SMA*). Behaves like A* until 'maxNodes'
+    search nodes are held in memory. Then, to make room, it deletes the worst
+    leaf (highest f, shallowest) and remembers its f in the parent, which is
+    regenerated from there when it looks promising again. Returns an optimal
+    path whenever one fits in the memory bound.
+
+    States held in memory are not generated again along a path that is not
+    cheaper, so graph problems do not blow up the tree. maxNodes can be
+    given on the command line, e.g. -a fn=smastar,heuristic=...,maxNodes=5000
+
+    Running time grows quickly as maxNodes gets close to the number of nodes
+    the optimal path needs: the search keeps deleting and regenerating the
+    same subtrees (on openMaze, maxNodes=60 can take over a hundred times as
+    long as maxNodes=2000). It gives up and returns [] after 'maxSteps' steps
+    -- successors generated or nodes found to have none left -- which is
+    100 * maxNodes by default.
+    """
+    import heapq
+    maxNodes = int(maxNodes)
+    if maxNodes < 2: raise Exception('smaStarSearch needs room for at least 2 nodes')
+    if maxSteps == None: maxSteps = 100 * maxNodes
+    maxSteps = int(maxSteps)
+    infinity = float('inf')
+    lowest, highest = [], []   # lazy heaps: best (low f, deep) and worst (high f, shallow)
+    inMemory = {}              # state -> cheapest node in memory for it
+    counter = [0]
+    used = [0]                 # number of nodes held in memory
+
+    def enqueue(node):
+        node.version += 1
+        node.queued = True
+        counter[0] += 1
+        heapq.heappush(lowest, (node.f, -node.depth, counter[0], node.version, node))
+        heapq.heappush(highest, (-node.f, node.depth, counter[0], node.version, node))
+
+    def dequeue(node):
+        node.version += 1
+        node.queued = False
+
+    def valid(entry):
+        return entry[4].queued and entry[3] == entry[4].version
+
+    def bestNode():
+        while lowest and not valid(lowest[0]):
+            heapq.heappop(lowest)
+        return lowest[0][4] if lowest else None
+
+    def allGenerated(node):
+        return node.successors is not None and node.nextIndex >= len(node.successors)
+
+    def backup(node):
+        # Once all successors were generated, f of a node is the lowest f below it
+        while node is not None and allGenerated(node):
+            fs = [child.f for child in node.children] + node.forgotten.values()
+            newF = min(fs) if fs else infinity
+            if newF == node.f: break
+            node.f = newF
+            if node.queued: enqueue(node)
+            node = node.parent
+
+    def forget(node):
+        # Removes a leaf from memory; its parent keeps its f (dead ends are
+        # dropped) and goes back to the queue to regenerate or drop it later
+        parent = node.parent
+        dequeue(node)
+        used[0] -= 1
+        if inMemory.get(node.state) is node:
+            del inMemory[node.state]
+        if parent is None: return
+        parent.children.remove(node)
+        if node.f < infinity:
+            parent.forgotten[node.index] = node.f
+        backup(parent)
+        if not parent.queued: enqueue(parent)
+
+    def worstLeaf(exclude):
+        skipped, worst = [], None
+        while highest:
+            entry = heapq.heappop(highest)
+            if not valid(entry): continue
+            node = entry[4]
+            if node is exclude or node.children:
+                skipped.append(entry)
+                continue
+            worst = node
+            break
+        for entry in skipped:
+            heapq.heappush(highest, entry)
+        return worst
+
+    def nextSuccessor(node):
+        # Generates the next successor of 'node', regenerating forgotten ones
+        # after the fresh ones. Returns None when there is nothing to generate.
+        if node.successors is None:
+            node.successors = problem.getSuccessors(node.state)
+        while node.nextIndex < len(node.successors):
+            index = node.nextIndex
+            node.nextIndex += 1
+            child = makeChild(node, index, None)
+            if child is not None: return child
+        while node.forgotten:
+            index = min(node.forgotten, key=node.forgotten.get)
+            child = makeChild(node, index, node.forgotten.pop(index))
+            if child is not None: return child
+        return None
+
+    def makeChild(node, index, f):
+        nextState, directionToMove, price = node.successors[index]
+        cost = node.getCost() + price
+        known = inMemory.get(nextState)
+        if known is not None and known.getCost() <= cost:
+            return None # a path as cheap is already in memory
+        depth = node.depth + 1
+        if f == None:
+            f = max(node.f, cost + heuristic(nextState, problem)) # pathmax
+        if depth >= maxNodes - 1 and not problem.isGoalState(nextState):
+            f = infinity # no room left for a path through it
+        return _BoundedNode(nextState, node, directionToMove, cost, depth, f, index)
+
+    startState = problem.getStartState()
+    root = _BoundedNode(startState, None, None, 0, 0, heuristic(startState, problem), None)
+    inMemory[startState] = root
+    enqueue(root)
+    used[0] = 1
+
+    for step in xrange(maxSteps):
+        best = bestNode()
+        if best is None or best.f == infinity:
+            return [] # No solution that fits in memory
+        if problem.isGoalState(best.state):
+            return best.getDirections()
+        child = nextSuccessor(best)
+        if child is None:
+            # Nothing left to generate under this node
+            dequeue(best)
+            if not best.children:
+                best.f = infinity
+                forget(best)
+            else:
+                backup(best)
+            continue
+        if used[0] >= maxNodes:
+            worst = worstLeaf(best)
+            if worst is None:
+                # Memory holds only the path to best, a path through the
+                # child would not fit: drop it as a dead end
+                backup(best)
+                continue
+            forget(worst)
+        best.children.append(child)
+        inMemory[child.state] = child
+        enqueue(child)
+        used[0] += 1
+        if allGenerated(best) and not best.forgotten:
+            dequeue(best) # every successor is in memory, best is now interior
+        backup(best)
+    return [] # Gave up after maxSteps steps
+
+def anytimeAStarSearch(problem, heuristic=nullHeuristic, budget=10, epsilon=3, epsilonStep=0.5):
+    """
+    Anytime repairing A* (ARA*). Starts with weighted A* (priority
+    g + epsilon * h), which finds a path quickly, then lowers epsilon and
+    repairs the search, reusing what was computed so far, to find better
+    paths. Stops when epsilon reaches 1 (the path is then optimal for an
+    admissible heuristic) or when 'budget' seconds have passed, and returns
+    the best path found. The first path is always searched for in full, even
+    past the budget, so a valid path is returned whenever one exists.
+
+    Each new incumbent is printed with its cost, its suboptimality bound
+    (the path costs at most bound times the optimal cost) and the number of
+    nodes expanded so far. Arguments can be given to SearchAgent, e.g.
+    -a fn=anytime,heuristic=foodHeuristic,budget=5
+    """
+    import time
+    from util import IndexedPriorityQueue
+    deadline = time.time() + float(budget)
+    epsilon, epsilonStep = float(epsilon), float(epsilonStep)
+    startState = problem.getStartState()
+    hCache = {}
+    def h(state):
+        if state not in hCache:
+            hCache[state] = heuristic(state, problem)
+        return hCache[state]
+
+    best = { startState: SearchNode(startState) } # state -> cheapest node found
+    openStates = IndexedPriorityQueue()
+    openStates.push(startState, epsilon * h(startState))
+    closed, incons = set(), set()
+    incumbent = None # best goal node so far
+    if problem.isGoalState(startState):
+        return []
+    expanded = 0
+    reported = None # last (incumbent, bound) printed
+
+    while True:
+        # Improve path: weighted A* until nothing in the fringe can beat the incumbent
+        outOfTime = False
+        while not openStates.isEmpty():
+            if incumbent is not None:
+                if expanded % 64 == 0 and time.time() > deadline:
+                    outOfTime = True
+                    break
+                if incumbent.getCost() <= openStates.getPriority(openStates.peek()):
+                    break
+            curState = openStates.pop()
+            closed.add(curState)
+            curNode = best[curState]
+            expanded += 1
+            for nextState, directionToMove, price in problem.getSuccessors(curState):
+                nextCost = curNode.getCost() + price
+                known = best.get(nextState)
+                if known is not None and known.getCost() <= nextCost:
+                    continue
+                nextNode = SearchNode(nextState, curNode, directionToMove, nextCost)
+                best[nextState] = nextNode
+                if problem.isGoalState(nextState):
+                    if incumbent is None or nextCost < incumbent.getCost():
+                        incumbent = nextNode
+                    continue # nothing to gain by expanding a goal
+                if nextState in closed:
+                    incons.add(nextState)
+                else:
+                    openStates.update(nextState, nextCost + epsilon * h(nextState))
+
+        if incumbent is None:
+            return [] # Cant reach the goal state
+        # Lowest g + h over states that may still lead to a cheaper goal
+        pending = list(openStates) + list(incons)
+        lowerBound = min([best[s].getCost() + h(s) for s in pending]) if pending else incumbent.getCost()
+        bound = min(epsilon, incumbent.getCost() / float(lowerBound)) if lowerBound > 0 else epsilon
+        bound = max(bound, 1.0)
+        if (incumbent, bound) != reported:
+            print('[AnytimeSearch] path cost %s, suboptimality bound %.3f, %d nodes expanded, %.2f seconds left' %
+                  (incumbent.getCost(), bound, expanded, max(0, deadline - time.time())))
+            reported = (incumbent, bound)
+        if outOfTime or bound <= 1.0 or not pending:
+            return incumbent.getDirections()
+
+        # Tighten epsilon and repair: inconsistent states rejoin the fringe
+        epsilon = max(1.0, epsilon - epsilonStep)
+        openStates = IndexedPriorityQueue()
+        for state in pending:
+            openStates.push(state, best[state].getCost() + epsilon * h(state))
+        closed, incons = set(), set()
+        if time.time() > deadline:
+            return incumbent.getDirections()
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    Jump point search: A* for 4-connected grids with a uniform step cost,
+    i.e. PositionSearchProblem with its default costFn. Instead of stepping to
+    each neighbor, a state moves straight on until the goal or a forced turn
+    (an opening next to a cell whose neighbor behind was a wall) and only the
+    cell where it stops, the jump point, goes into the fringe. In open areas
+    this skips the many equally short paths that A* would all explore.
+
+    Only expanded jump points count in problem._expanded, as if they were
+    expanded through getSuccessors. Problems that are not a grid with a single
+    goal and uniform costs (e.g. StayEastSearchAgent's) are solved by
+    aStarSearch instead.
+    """
+    import heapq
+    from game import Actions
+    walls, goal = getattr(problem, 'walls', None), getattr(problem, 'goal', None)
+    costFn = getattr(problem, 'costFn', None)
+    if walls == None or goal == None or costFn == None or 'expandActions' in dir(problem):
+        return aStarSearch(problem, heuristic)
+    openCells = walls.asList(False)
+    stepCost = costFn(goal)
+    for cell in openCells:
+        if costFn(cell) != stepCost:
+            return aStarSearch(problem, heuristic)
+
+    width, height = walls.width, walls.height
+    def isOpen(x, y):
+        return 0 <= x < width and 0 <= y < height and not walls[x][y]
+
+    def jump(x, y, dx, dy):
+        "Moves from (x,y) in direction (dx,dy), returns the jump point reached or None"
+        while True:
+            x, y = x + dx, y + dy
+            if not isOpen(x, y): return None
+            if (x, y) == goal: return (x, y)
+            if dx != 0:
+                if (isOpen(x, y + 1) and not isOpen(x - dx, y + 1)) or \
+                   (isOpen(x, y - 1) and not isOpen(x - dx, y - 1)):
+                    return (x, y)
+            else:
+                if (isOpen(x + 1, y) and not isOpen(x + 1, y - dy)) or \
+                   (isOpen(x - 1, y) and not isOpen(x - 1, y - dy)):
+                    return (x, y)
+                # Moving vertically, any horizontal jump point makes this one
+                if jump(x, y, 1, 0) != None or jump(x, y, -1, 0) != None:
+                    return (x, y)
+
+    bookkeeping = '_visited' in dir(problem)
+    startState = problem.getStartState()
+    # state -> [cost, parent jump point, direction it was reached in]
+    reached = {startState: [0, None, (0, 0)]}
+    closed = set()
+    fringe = [(heuristic(startState, problem), 0, startState)]
+    count = 0
+    while fringe:
+        state = heapq.heappop(fringe)[2]
+        if state in closed: continue
+        closed.add(state)
+        cost, parent, (dx, dy) = reached[state]
+        if problem.isGoalState(state):
+            # Walk back through the jump points, expanding each straight line
+            actions = []
+            while parent != None:
+                (x1, y1), (x2, y2) = parent, state
+                distance = abs(x2 - x1) + abs(y2 - y1)
+                direction = Actions.vectorToDirection(((x2 - x1) / distance, (y2 - y1) / distance))
+                actions = [direction] * distance + actions
+                state = parent
+                parent = reached[state][1]
+            return actions
+
+        # Bookkeeping, as PositionSearchProblem.getSuccessors does it
+        problem._expanded += 1
+        if bookkeeping and state not in problem._visited:
+            problem._visited[state] = True
+            problem._visitedlist.append(state)
+
+        # Keep going straight or turn; never go back where we came from
+        if dx != 0:
+            directions = [(dx, 0), (0, 1), (0, -1)]
+        elif dy != 0:
+            directions = [(0, dy), (1, 0), (-1, 0)]
+        else:
+            directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+        x, y = state
+        for direction in directions:
+            jumpPoint = jump(x, y, direction[0], direction[1])
+            if jumpPoint == None or jumpPoint in closed: continue
+            nextCost = cost + stepCost * (abs(jumpPoint[0] - x) + abs(jumpPoint[1] - y))
+            if jumpPoint not in reached or nextCost < reached[jumpPoint][0]:
+                reached[jumpPoint] = [nextCost, state, direction]
+                count += 1
+                heapq.heappush(fringe, (nextCost + heuristic(jumpPoint, problem), count, jumpPoint))
+    return [] # Cant reach the goal state
+
+def bitsetBreadthFirstSearch(problem):
+    """
+    Breadth first search on the bits of the open cells (see bitsetGrid.py):
+    every level expands the whole frontier with a few shifts and masks of one
+    integer instead of a node at a time. Returns a shortest path in moves, as
+    breadthFirstSearch does, for problems whose states are (x,y) positions
+    with a single goal, i.e. PositionSearchProblem; other problems are solved
+    by breadthFirstSearch.
+
+    Every cell closer to the start than the goal counts in problem._expanded,
+    as breadthFirstSearch expands those before it reaches the goal.
+    """
+    from bitsetGrid import getBitsetGrid
+    walls, goal = getattr(problem, 'walls', None), getattr(problem, 'goal', None)
+    if walls == None or goal == None or 'expandActions' in dir(problem):
+        return breadthFirstSearch(problem)
+    grid = getBitsetGrid(walls)
+    startState = problem.getStartState()
+    levels = grid.levels([startState], goal)
+    if not levels or not levels[-1] & grid.getBit(goal):
+        return [] # Cant reach the goal state
 
-    return [] if not allStates else ([], paths) # Cant reach the goal state, better stay where you are
+    # Bookkeeping, as PositionSearchProblem.getSuccessors does it. Listing
+    # the visited cells one by one costs more than the search itself, so
+    # that is only done when they are going to be drawn
+    bookkeeping = '_visited' in dir(problem) and getattr(problem, 'visualize', False)
+    for level in levels[:-1]:
+        problem._expanded += bin(level).count('1')
+        if bookkeeping:
+            for state in grid.getPositions(level):
+                if state not in problem._visited:
+                    problem._visited[state] = True
+                    problem._visitedlist.append(state)
+    # Called for its side effect only (the goal was reached): the goal test of
+    # PositionSearchProblem is what draws the expanded cells when visualizing
+    problem.isGoalState(goal)
+    return grid.pathTo(levels, goal)
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+ucsIndexed = uniformCostSearchIndexed
+astarIndexed = aStarSearchIndexed
+bds = bidirectionalSearch
+idastar = idaStarSearch
+smastar = smaStarSearch
+anytime = anytimeAStarSearch
+jps = jumpPointSearch
+bitbfs = bitsetBreadthFirstSearch
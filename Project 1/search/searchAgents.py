@@ -37,9 +37,13 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import Grid
 import util
 import time
 import search
+import searchStats
+from distanceTable import getDistanceTable, UNREACHABLE
+from layoutGraph import getLayoutGraph, ContractedGraph, shortestDistances, NO_PATH
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -69,20 +73,34 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    Other arguments of the search function can be given as agent arguments
+    too, e.g. -a fn=smastar,heuristic=manhattanHeuristic,maxNodes=5000
+
+    stats=<file> records instrumentation of each search as a JSON line in
+    <file> (see searchStats.py)
+
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', stats=None, **searchOptions):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
+        # stats=<file> turns on search instrumentation, records go to that file (see searchStats.py)
+        if stats != None:
+            searchStats.enable(stats)
+
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError, fn + ' is not a search function in search.py.'
         func = getattr(search, fn)
+        # Any other agent argument (e.g. maxNodes=5000) is passed on to the search function
+        for option in searchOptions:
+            if option not in func.func_code.co_varnames[:func.func_code.co_argcount]:
+                raise AttributeError, option + ' is not an argument of ' + fn + ' in search.py.'
         if 'heuristic' not in func.func_code.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: func(x, **searchOptions)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -92,7 +110,7 @@ class SearchAgent(Agent):
                 raise AttributeError, heuristic + ' is not a function in searchAgents.py or search.py.'
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: func(x, heuristic=heur, **searchOptions)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -114,9 +132,16 @@ class SearchAgent(Agent):
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
         self.actions  = self.searchFunction(problem) # Find a path
+        # Problems on contracted mazes return whole corridors as single actions
+        if 'expandActions' in dir(problem): self.actions = problem.expandActions(self.actions)
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if '_searchStats' in dir(problem):
+            record = problem._searchStats
+            print('Search stats: %(pushes)d pushes, %(pops)d pops (%(duplicatePops)d duplicates), '
+                  'peak fringe %(peakFringe)d; %(successorTime).3fs successors, '
+                  '%(heuristicTime).3fs heuristic, %(fringeTime).3fs fringe' % record)
 
     def getAction(self, state):
         """
@@ -154,6 +179,8 @@ class PositionSearchProblem(search.SearchProblem):
         goal: A position in the gameState
         """
         self.walls = gameState.getWalls()
+        # Moves between open cells, compiled once per layout (see layoutGraph.py)
+        self.graph = getLayoutGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
@@ -194,14 +221,9 @@ class PositionSearchProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        for nextState, action in self.graph.getMoves(state):
+            cost = self.costFn(nextState)
+            successors.append( ( nextState, action, cost) )
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -211,6 +233,28 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the states from which 'state' can be reached in one move, as
+        triples (predecessor, action, stepCost) where 'action' leads from the
+        predecessor to 'state'. On the grid these are the successors with the
+        reverse action; the cost is that of stepping into 'state'.
+        Used by search.bidirectionalSearch; counts as an expansion.
+        """
+        cost = self.costFn(state)
+        predecessors = [ (prevState, action, cost) for prevState, action in self.graph.getReverseMoves(state) ]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -227,6 +271,62 @@ class PositionSearchProblem(search.SearchProblem):
             cost += self.costFn((x,y))
         return cost
 
+class ContractedPositionSearchProblem(PositionSearchProblem):
+    """
+    The PositionSearchProblem on a maze with its dead ends removed and its
+    corridors collapsed (see layoutGraph.ContractedGraph). States are the
+    junctions of the maze, the start and the goal; a successor walks a whole
+    corridor, so its action is a tuple of Directions and its cost is the sum
+    of costFn over the cells entered. Use expandActions to turn a path back
+    into single Directions.
+
+    Shortest paths are the same as in PositionSearchProblem (bfs finds the
+    path through the fewest corridors instead), while mazes like bigMaze need
+    only a fraction of the expansions.
+
+    > python pacman.py -l bigMaze -p SearchAgent -a fn=astar,prob=ContractedPositionSearchProblem,heuristic=manhattanHeuristic
+    """
+    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
+        PositionSearchProblem.__init__(self, gameState, costFn, goal, start, warn, visualize)
+        self.contracted = ContractedGraph(self.graph, keep=[self.startState, self.goal])
+        self._successors = {}
+        self._predecessors = {}
+        for junction, edges in self.contracted.edges.items():
+            self._successors.setdefault(junction, [])
+            for nextJunction, actions, cells in edges:
+                cost = sum(costFn(cell) for cell in cells)
+                self._successors[junction].append( (nextJunction, actions, cost) )
+                self._predecessors.setdefault(nextJunction, []).append( (junction, actions, cost) )
+
+    def getSuccessors(self, state):
+        "Returns (nextJunction, corridor actions, corridor cost) triples."
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+        return list(self._successors.get(state, []))
+
+    def getPredecessors(self, state):
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+        return list(self._predecessors.get(state, []))
+
+    def expandActions(self, actions):
+        "Turns a path of corridor actions into a list of Directions."
+        directions = []
+        for action in actions:
+            if isinstance(action, tuple):
+                directions.extend(action)
+            else:
+                directions.append(action)
+        return directions
+
+    def getCostOfActions(self, actions):
+        if actions == None: return 999999
+        return PositionSearchProblem.getCostOfActions(self, self.expandActions(actions))
+
 class StayEastSearchAgent(SearchAgent):
     """
     An agent for position search with a cost function that penalizes being in
@@ -271,34 +371,18 @@ def euclideanHeuristic(position, problem, info={}):
 class CornersProblem(search.SearchProblem):
     """
     This search problem finds paths through all four corners of a layout.
-    You must select a suitable state space and successor function
-    """
-    # Encapsulates state information in the 'corners problem'
-    class State:
-        def __init__(self, pacmanPosition, cornersToVisit):
-            self.pacmanPosition = pacmanPosition
-            self.cornersToVisit = cornersToVisit
-
-	def __str__(self):
-            return 'pos: %s, corners: %s' % (self.getPacmanPosition(), self.getCornersToVisit())
-	
-	def __eq__(self, other):
-            return self.getCornersToVisit() == other.getCornersToVisit() and \
-                   self.getPacmanPosition() == other.getPacmanPosition()
-
-        # whenever overriding equals, hash should be overriden too !!
-        def __hash__(self):
-            return hash(self.getCornersToVisit()) + hash(self.getPacmanPosition())
-
-        getCornersToVisit = lambda self: self.cornersToVisit
-        getPacmanPosition = lambda self: self.pacmanPosition
-	
 
+    A search state is a tuple ( pacmanPosition, cornerBits ) where bit i of
+    cornerBits is set while problem.corners[i] is still to be visited, so
+    states hash and compare as plain tuples of ints. getCornersToVisit(cornerBits)
+    returns the corners themselves.
+    """
     def __init__(self, startingGameState):
         """
         Stores the walls, pacman's starting position and corners.
         """
         self.walls = startingGameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startingPosition = startingGameState.getPacmanPosition()
         top, right = self.walls.height-2, self.walls.width-2
         self.corners = ((1,1), (1,top), (right, 1), (right, top))
@@ -308,8 +392,13 @@ class CornersProblem(search.SearchProblem):
         self._expanded = 0 # DO NOT CHANGE; Number of search nodes expanded
         # Please add any code here which you would like to use
         # in initializing the problem
-        self.startState = self.State(self.startingPosition, self.corners)
-        
+        self.heuristicInfo = {} # A dictionary for the heuristic to store information
+        # Bit of each corner in cornerBits
+        self.cornerBits = {}
+        for i, corner in enumerate(self.corners):
+            # Corners coincide on boards 3 wide or 3 tall, one visit clears all their bits
+            self.cornerBits[corner] = self.cornerBits.get(corner, 0) | (1 << i)
+        self.startState = (self.startingPosition, (1 << len(self.corners)) - 1)
 
     def getStartState(self):
         """
@@ -322,21 +411,13 @@ class CornersProblem(search.SearchProblem):
         """
         Returns whether this search state is a goal state of the problem.
         """
-        return len( state.getCornersToVisit() ) == 0
+        return state[1] == 0
 
-    def getSuccessors(self, state):
-        
-        # Decompose logic into several helper routines
-        def getNextPosition(curPosition, action):
-            x, y = curPosition
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            return (nextx, nexty)
-
-        def hitsWall(position):
-            x, y = position
-            return self.walls[x][y]
+    def getCornersToVisit(self, cornerBits):
+        "Returns the corners whose bits are set in cornerBits"
+        return tuple(corner for i, corner in enumerate(self.corners) if cornerBits & (1 << i))
 
+    def getSuccessors(self, state):
         """
         Returns successor states, the actions they require, and a cost of 1.
 
@@ -348,16 +429,13 @@ class CornersProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-
-            nextPosition = getNextPosition(state.getPacmanPosition(), action)
-            if hitsWall(nextPosition):
-                continue
-            # Exclude the corner from list if nextPosition coincides with it
-            nextCornersToVisit = tuple (filter(lambda corner: corner != nextPosition, \
-                                               state.getCornersToVisit()) )
+        position, cornerBits = state
+        # Moves into open cells only, in NORTH, SOUTH, EAST, WEST order
+        for nextPosition, action in self.graph.getMoves(position):
+            # Clear the corner's bit if nextPosition coincides with it
+            nextCornerBits = cornerBits & ~self.cornerBits.get(nextPosition, 0)
             # next state, movement to be done, unit cost
-            successors.append( (self.State(nextPosition, nextCornersToVisit), action, 1) )
+            successors.append( ( (nextPosition, nextCornerBits), action, 1) )
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -389,41 +467,73 @@ def cornersHeuristic(state, problem):
     shortest path from the state to a goal of the problem; i.e.  it should be
     admissible (as well as consistent).
     """
-    mdist = util.manhattanDistance
-    def relaxedPathCost(curPosition, cornersToVisit):
-        if len(cornersToVisit) == 0:
-            return 0
-        
-        min_cost = -1
-        for i in range(len(cornersToVisit)):
-            curCorner = cornersToVisit[i]
-            cornersWithoutCurrent = cornersToVisit[:i] + cornersToVisit[i+1:]
-            curCornerFirstCost = mdist(curPosition, curCorner) + relaxedPathCost(curCorner, cornersWithoutCurrent)
-            if min_cost == -1 or curCornerFirstCost < min_cost:
-                min_cost = curCornerFirstCost
-
-        return min_cost 
-
-    pacmanPosition = state.getPacmanPosition()
-    cornersToVisit = state.getCornersToVisit()
-	
-    ''' The heuristic works as follows: it relaxes problem by assuming no
-        walls exist at all, and calculating path to goal under that 
-        assumption. All the sequences of corner visiting are examined in 
-        order to minimize the path to goal. Heuristic is obviously consistent
-        because: cost of any action in this problem is unit (1), the drop in 
-        heuristic between any two consecutive states is <= 1, which is proved
-        below.
-        Proof:
-        Without loss of generality say that we are in state A and B is among
-        it's successors. Since our heuristic is actually shortest path of traversing 
-        corners assuming there are no walls, h(A) should be at most h(B) + 1, 
-        because when pathing from A, B is just another option with cost of 1. 
-        This concludes that h(A) - h(B) <= 1
+    if 'cornerTours' not in problem.heuristicInfo:
+        problem.heuristicInfo['cornerTours'] = CornerTours(problem)
+    tours = problem.heuristicInfo['cornerTours']
+
+    pacmanPosition, mask = state
+    if mask == 0: return 0
+
+    ''' The heuristic is the length of the shortest tour through the corners
+        left: maze distance to the first corner plus the best tour from that
+        corner through the rest (precomputed for every set of corners by
+        CornerTours). Maze distances are true shortest paths, so this is the
+        exact cost to the goal -- which is admissible, and consistent since
+        one move changes the exact cost by at most its own cost of 1. It is
+        infinite when a corner left is a wall or cannot be reached.
     '''
-    h = relaxedPathCost(pacmanPosition, cornersToVisit)
+    bestTours = tours.bestTours[mask]
+    distancesFrom = tours.distancesFrom
+    cell = tours.cellIndex[pacmanPosition]
+    h = None
+    for i in tours.members[mask]:
+        cost = distancesFrom[i][cell] + bestTours[i]
+        if h == None or cost < h:
+            h = cost
     return h
 
+class CornerTours:
+    """
+    What cornersHeuristic needs to know about a CornersProblem, computed once:
+
+      members[mask]          indices of the corners in a set
+      distancesFrom[i]       maze distances from corner i to every cell, by
+                             cell id of the layout graph (cellIndex)
+      bestTours[mask][i]     length of the shortest walk that starts at corner
+                             i and visits every corner of the set (i included)
+
+    Corners that are walls or cannot be reached are infinitely far away, so
+    are the tours through them: states that still have to visit one are dead
+    ends.
+    """
+    def __init__(self, problem):
+        corners = problem.corners
+        numCorners = len(corners)
+        self.members = [[i for i in range(numCorners) if mask & (1 << i)]
+                        for mask in range(1 << numCorners)]
+        # One breadth first search per corner, cheaper than the all-pairs table
+        graph = getLayoutGraph(problem.walls)
+        self.cellIndex = graph.cellIndex
+        infinity = float('inf')
+        self.distancesFrom = []
+        for corner in corners:
+            if corner in graph.cellIndex:
+                distances = shortestDistances(graph, [corner])
+                self.distancesFrom.append([infinity if d == NO_PATH else d for d in distances])
+            else:
+                self.distancesFrom.append([infinity] * graph.numCells)
+        between = [[self.distancesFrom[i][graph.cellIndex[c2]] if c2 in graph.cellIndex else infinity
+                    for c2 in corners] for i in range(numCorners)]
+
+        # Held-Karp over subsets, smaller sets first (a subset is a smaller number)
+        self.bestTours = [[0] * numCorners for mask in range(1 << numCorners)]
+        for mask in range(1, 1 << numCorners):
+            for i in self.members[mask]:
+                rest = mask & ~(1 << i)
+                if rest:
+                    self.bestTours[mask][i] = min(between[i][j] + self.bestTours[rest][j]
+                                                  for j in self.members[rest])
+
 class AStarCornersAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
     def __init__(self):
@@ -435,13 +545,23 @@ class FoodSearchProblem:
     A search problem associated with finding the a path that collects all of the
     food (dots) in a Pacman game.
 
-    A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
+    A search state in this problem is a tuple ( pacmanPosition, foodBits ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodBits:       an integer bitmask of the remaining food; bit i is set
+                      while the dot at problem.foodPositions[i] is uneaten
+
+    Eating a dot is a single bit clear, and comparing or hashing a state is
+    cheap, unlike with a whole food Grid per state. Use problem.getFoodList(foodBits)
+    (or getFoodGrid) to get the remaining dots back.
     """
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        # Number every dot of the starting board, only those can ever be eaten
+        self.foodPositions = startingGameState.getFood().asList()
+        self.foodIndex = dict( (pos, i) for i, pos in enumerate(self.foodPositions) )
+        startFood = (1 << len(self.foodPositions)) - 1
+        self.start = (startingGameState.getPacmanPosition(), startFood)
         self.walls = startingGameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
@@ -450,20 +570,35 @@ class FoodSearchProblem:
         return self.start
 
     def isGoalState(self, state):
-        return state[1].count() == 0
+        return state[1] == 0
+
+    def getFoodList(self, foodBits):
+        "Returns the positions of the dots still set in foodBits"
+        positions = []
+        while foodBits:
+            lowest = foodBits & -foodBits
+            positions.append(self.foodPositions[lowest.bit_length() - 1])
+            foodBits ^= lowest
+        return positions
+
+    def getFoodGrid(self, foodBits):
+        "Returns remaining food as a Grid, like GameState.getFood() does"
+        grid = Grid(self.walls.width, self.walls.height)
+        for x, y in self.getFoodList(foodBits):
+            grid[x][y] = True
+        return grid
 
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        position, foodBits = state
+        for nextPosition, direction in self.graph.getMoves(position):
+            nextFood = foodBits
+            bit = self.foodIndex.get(nextPosition)
+            if bit is not None:
+                nextFood &= ~(1 << bit)
+            successors.append( ( (nextPosition, nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -499,9 +634,9 @@ def foodHeuristic(state, problem):
     other hand, inadmissible or inconsistent heuristics may find optimal
     solutions, so be careful.
 
-    The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a Grid
-    (see game.py) of either True or False. You can call foodGrid.asList() to get
-    a list of food coordinates instead.
+    The state is a tuple ( pacmanPosition, foodBits ) where foodBits is an
+    integer bitmask of the remaining food (see FoodSearchProblem). You can call
+    problem.getFoodList(foodBits) to get a list of food coordinates instead.
 
     If you want access to info like walls, capsules, etc., you can query the
     problem.  For example, problem.walls gives you a Grid of where the walls
@@ -514,49 +649,93 @@ def foodHeuristic(state, problem):
     Subsequent calls to this heuristic can access
     problem.heuristicInfo['wallCount']
     """
-    mdist = util.manhattanDistance
-    pacmanPosition, foodGrid = state
-    food = foodGrid.asList()
+    pacmanPosition, foodBits = state
+    if foodBits == 0: return 0
     '''
     Now that one was tricky!
-    The idea is to minimize maximal distance from given pacman position to any
-    uneaten food unit. Hence heuristic function should return maximum distance
-    between pacman and any food point. One way to do it is to use provided 'mazeDistance'
-    function which is just a wrapper for bfs agent. But this approach has a 
-    downside that in worst-case lots of redundant calculations will be performed.
-    Remember, Dijkstra algorithm computes shortes path not only between source 
-    and goal, but also between source and any other point. That's the reason
-    why 'genericSearch' in search.py is so generic! It can give us a dictionary of
-    shortest paths to all traversed states.
-    The bottom line is, we solve simpler problem to provide heuristic to main one.
-    And boy, it completes in about 2 seconds!!!
+    Eating all the food takes at least as long as reaching the nearest dot and
+    then connecting all the dots, and connecting them can't take less than
+    the minimum spanning tree of the dots under maze distances. So the
+    heuristic is nearest dot + MST weight. (That is never less than the
+    distance to the farthest dot: the MST holds a path from the nearest dot
+    to the farthest one, and maze distances obey the triangle inequality.)
+    Dots that cannot be reached are infinitely far away, so states with such
+    dots, which can never eat all the food, get an infinite heuristic.
+    Maze distances from every dot are computed once per problem (see
+    FoodDistances), and the MST of a set of dots, which many states share, is
+    cached per food bitmask.
     '''
     '''
-    Proof of consistency: again say A is a state and B is one of it's successors.
-    maximum distance from A to any of the food points should differ from maximum
-    distance from B to any of the food points by at most one, since B is one of 
-    the ways for A to get to it's farthest food and it's cost is one.
-    This concludes h(A) - h(B) <= 1
+    Proof of consistency: say A is a state and B one of its successors.
+    If B eats no dot, the MST is the same and the nearest dot is at most one
+    step closer, so h(A) - h(B) <= 1. If B eats dot d, the nearest dot of A
+    was d at distance 1, and MST(food of A) <= MST(food of B) + distance from
+    d to the nearest other dot, which is B's nearest distance, so again
+    h(A) <= 1 + h(B).
     '''
-    from search import dijkstraWithAllPaths
-
-    # if dictionary is not yet populated with paths, do it
-    if 'paths' not in problem.heuristicInfo:
-        paths = {} # format: goal state -> (dictionary of (state -> path to goal state))
-        for meal in food:
-            # Create new instance of position search prob, specifying start and goal states
-            # Tricky: goal is intentionally unreacheable for the algorithm to traverse all states!
-            fromThisMeal = dijkstraWithAllPaths( PositionSearchProblem(problem.startingGameState, \
-                                                         start = meal, warn = False, goal = "noo") )
-            paths[meal] = fromThisMeal[1] # (empty dirs cuz unreacheable, dict of paths to all states from meal)
-        problem.heuristicInfo['paths'] = paths
-
-    # now we are in a home stretch 
-    paths = problem.heuristicInfo['paths']
-    if len(food) == 0: return 0
-    return max( len(paths[meal][pacmanPosition]) for meal in food )
-            
- 
+    if 'foodDistances' not in problem.heuristicInfo:
+        problem.heuristicInfo['foodDistances'] = FoodDistances(problem)
+    foodDistances = problem.heuristicInfo['foodDistances']
+
+    cell = foodDistances.cellIndex[pacmanPosition]
+    distancesFrom = foodDistances.distancesFrom
+    nearest = None
+    bits = foodBits
+    while bits:
+        lowest = bits & -bits
+        distance = distancesFrom[lowest.bit_length() - 1][cell]
+        if nearest == None or distance < nearest: nearest = distance
+        bits ^= lowest
+    return nearest + foodDistances.spanningTreeCost(foodBits)
+
+class FoodDistances:
+    """
+    Maze distances foodHeuristic needs for a FoodSearchProblem, computed once:
+
+      distancesFrom[i]    maze distances from dot i (problem.foodPositions[i])
+                          to every cell, by cell id of the layout graph
+      between[i][j]       maze distance between dots i and j
+
+    and an LRU cache of minimum spanning tree costs per food bitmask. Cells
+    that cannot be reached from a dot are infinitely far from it (instead of
+    NO_PATH), so are the spanning trees through them.
+    """
+    # Food bitmasks whose MST cost is kept
+    CACHE_SIZE = 100000
+
+    def __init__(self, problem):
+        graph = getLayoutGraph(problem.walls)
+        self.cellIndex = graph.cellIndex
+        infinity = float('inf')
+        self.distancesFrom = [[infinity if d == NO_PATH else d for d in shortestDistances(graph, [dot])]
+                              for dot in problem.foodPositions]
+        dotCells = [graph.cellIndex[dot] for dot in problem.foodPositions]
+        self.between = [[distances[cell] for cell in dotCells] for distances in self.distancesFrom]
+        self.spanningTrees = util.LRUCache(self.CACHE_SIZE)
+
+    def spanningTreeCost(self, foodBits):
+        "Weight of the minimum spanning tree (Prim's) of the dots in foodBits."
+        cost = self.spanningTrees.get(foodBits)
+        if cost != None: return cost
+        dots = []
+        bits = foodBits
+        while bits:
+            lowest = bits & -bits
+            dots.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        cost = 0
+        # Cheapest edge from the tree to every dot not in it yet
+        first = self.between[dots[0]]
+        outside = dict( (dot, first[dot]) for dot in dots[1:] )
+        while outside:
+            dot = min(outside, key=outside.get)
+            cost += outside.pop(dot)
+            distances = self.between[dot]
+            for other in outside:
+                if distances[other] < outside[other]:
+                    outside[other] = distances[other]
+        self.spanningTrees[foodBits] = cost
+        return cost
 
 class ClosestDotSearchAgent(SearchAgent):
 
@@ -568,17 +747,9 @@ class ClosestDotSearchAgent(SearchAgent):
 
     "Search for all food using a sequence of searches"
     def registerInitialState(self, state):
-        self.actions = []
-        currentState = state
-        while(currentState.getFood().count() > 0):
-            nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
-            self.actions += nextPathSegment
-            for action in nextPathSegment:
-                legal = currentState.getLegalActions()
-                if action not in legal:
-                    t = (str(action), str(currentState))
-                    raise Exception, 'findPathToClosestDot returned an illegal move: %s!\n%s' % t
-                currentState = currentState.generateSuccessor(0, action)
+        # Plans on cell ids and a food array instead of replaying GameStates,
+        # the moves are the same as those of repeated findPathToClosestDot
+        self.actions = planClosestDotTour(state.getWalls(), state.getPacmanPosition(), state.getFood())
         self.actionIndex = 0
         print 'Path found with cost %d.' % len(self.actions)
 
@@ -597,6 +768,69 @@ class ClosestDotSearchAgent(SearchAgent):
          
        
 
+def planClosestDotTour(walls, startPosition, food):
+    """
+    Returns the actions that eat all of the food by always walking to the
+    closest dot -- the same actions as calling bfs on an AnyFoodSearchProblem
+    and replaying the path, repeated until no food is left.
+
+    Every breadth first search runs on the layout graph (see layoutGraph.py)
+    and pops cells in the same order as bfs (successors in getSuccessors order,
+    goal test on pop), so it picks the same dot along
+    the same path. Cells on that path are closer than the dot and therefore
+    have no food, only the dot itself gets eaten.
+    """
+    graph = getLayoutGraph(walls)
+    cells, cellIndex, numCells = graph.cells, graph.cellIndex, graph.numCells
+    offsets, targets, moveActions = graph.offsets, graph.targets, graph.actions
+    hasFood = bytearray(numCells)
+    for cell in food.asList():
+        hasFood[cellIndex[cell]] = 1
+    foodLeft = sum(hasFood)
+
+    current = cellIndex[startPosition]
+    if hasFood[current]:
+        hasFood[current] = 0
+        foodLeft -= 1
+    # seen[i] == searchId means cell i was reached in this search, so the arrays
+    # are allocated once for the whole tour
+    seen = [0] * numCells
+    parent = [0] * numCells
+    parentAction = [None] * numCells
+    actions = []
+    searchId = 0
+    while foodLeft > 0:
+        searchId += 1
+        seen[current] = searchId
+        queue, head, dot = [current], 0, None
+        while head < len(queue):
+            cell = queue[head]
+            head += 1
+            if hasFood[cell]:
+                dot = cell
+                break
+            for k in xrange(offsets[cell], offsets[cell + 1]):
+                nextCell = targets[k]
+                if seen[nextCell] != searchId:
+                    seen[nextCell] = searchId
+                    parent[nextCell] = cell
+                    parentAction[nextCell] = moveActions[k]
+                    queue.append(nextCell)
+        if dot == None:
+            raise Exception('Food left at unreachable cells: %s' %
+                            [cells[i] for i in range(numCells) if hasFood[i]])
+        segment = []
+        cell = dot
+        while cell != current:
+            segment.append(parentAction[cell])
+            cell = parent[cell]
+        segment.reverse()
+        actions += segment
+        hasFood[dot] = 0
+        foodLeft -= 1
+        current = dot
+    return actions
+
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
     A search problem for finding a path to any food.
@@ -618,6 +852,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         self.food = gameState.getFood()
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.graph = getLayoutGraph(self.walls)
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
@@ -632,9 +867,12 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- Pacman's
-    position in that state is ignored.
+    Returns the maze distance between any two points, looked up in the
+    all-pairs distance table of the layout (see distanceTable.py). The gameState
+    can be any game state -- Pacman's position in that state is ignored.
+
+    Points with no path between them are 0 apart, as with the breadth first
+    search this used to run (the table itself stores UNREACHABLE for them).
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
@@ -645,5 +883,7 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    # All-pairs table of the layout, computed (or loaded from disk) on first use
+    distance = getDistanceTable(walls).getDistance(point1, point2)
+    if distance == UNREACHABLE: return 0
+    return distance
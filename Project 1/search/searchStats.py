@@ -0,0 +1,173 @@
+# searchStats.py
+# --------------
+
+
+"""
+Instrumentation for the searches in search.py. It is off by default. Once
+enabled, every bfs/dfs/ucs/astar run through genericSearch records:
+
+  pushes, pops        fringe operations
+  duplicatePops       pops skipped because the state was already expanded
+  peakFringe          largest number of nodes in the fringe at once
+  successorTime       seconds spent in problem.getSuccessors
+  heuristicTime       seconds spent in the heuristic
+  fringeTime          seconds spent in fringe push/pop, heuristic excluded
+
+and exports them as one JSON record per search (JSON lines when written to a
+file). That tells whether a slow search is heuristic-bound or successor-bound.
+
+Example:
+searchStats.enable('stats.jsonl')
+search.astar(problem, heuristic)
+print searchStats.records[-1]['heuristicTime']
+
+From the command line: -a fn=astar,heuristic=manhattanHeuristic,stats=stats.jsonl
+"""
+
+import time, json
+
+# Records of the searches run while enabled, as dictionaries
+records = []
+
+_enabled = False
+_outputPath = None
+
+def enable(outputPath=None):
+    """
+    Turns instrumentation on. If outputPath is given, every record is also
+    appended to that file as a line of JSON.
+    """
+    global _enabled, _outputPath
+    _enabled = True
+    _outputPath = outputPath
+
+def disable():
+    global _enabled, _outputPath
+    _enabled = False
+    _outputPath = None
+
+def isEnabled():
+    return _enabled
+
+def newRecord(algorithm, problem):
+    "Returns a SearchStats for a search about to run, or None when disabled."
+    if not _enabled: return None
+    return SearchStats(algorithm, problem)
+
+class SearchStats:
+    """
+    Counters and timers of a single search.
+    """
+    def __init__(self, algorithm, problem):
+        self.algorithm = algorithm
+        self.problemType = problem.__class__.__name__
+        self.pushes = 0
+        self.pops = 0
+        self.duplicatePops = 0
+        self.fringeSize = 0
+        self.peakFringe = 0
+        self.successorCalls = 0
+        self.successorTime = 0.0
+        self.heuristicCalls = 0
+        self.heuristicTime = 0.0
+        self.fringeTime = 0.0
+        self.startTime = time.time()
+
+    def timeHeuristic(self, heuristic):
+        "Wraps heuristic(state, problem) so calls to it are counted and timed."
+        def timedHeuristic(state, problem=None):
+            start = time.time()
+            value = heuristic(state, problem)
+            self.heuristicTime += time.time() - start
+            self.heuristicCalls += 1
+            return value
+        return timedHeuristic
+
+    def wrapFringe(self, fringe):
+        return InstrumentedFringe(fringe, self)
+
+    def wrapProblem(self, problem):
+        return InstrumentedProblem(problem, self)
+
+    def finish(self, problem, path):
+        """
+        Completes the record once the search returned 'path' and exports it.
+        The record is also left in problem._searchStats.
+        """
+        record = {
+            'algorithm': self.algorithm,
+            'problem': self.problemType,
+            'pathLength': len(path),
+            'expanded': getattr(problem, '_expanded', None),
+            'pushes': self.pushes,
+            'pops': self.pops,
+            'duplicatePops': self.duplicatePops,
+            'peakFringe': self.peakFringe,
+            'successorCalls': self.successorCalls,
+            'successorTime': self.successorTime,
+            'heuristicCalls': self.heuristicCalls,
+            'heuristicTime': self.heuristicTime,
+            'fringeTime': self.fringeTime,
+            'totalTime': time.time() - self.startTime,
+        }
+        records.append(record)
+        problem._searchStats = record
+        if _outputPath != None:
+            f = open(_outputPath, 'a')
+            try:
+                f.write(json.dumps(record, sort_keys=True) + '\n')
+            finally:
+                f.close()
+        return record
+
+class InstrumentedFringe:
+    """
+    Wraps a Stack, Queue or priority queue and counts and times its operations.
+    Time spent in the heuristic (called by priority functions on push) is
+    not counted as fringe time.
+    """
+    def __init__(self, fringe, stats):
+        self.fringe = fringe
+        self.stats = stats
+
+    def push(self, item):
+        stats = self.stats
+        heuristicTime = stats.heuristicTime
+        start = time.time()
+        self.fringe.push(item)
+        stats.fringeTime += time.time() - start - (stats.heuristicTime - heuristicTime)
+        stats.pushes += 1
+        stats.fringeSize += 1
+        if stats.fringeSize > stats.peakFringe:
+            stats.peakFringe = stats.fringeSize
+
+    def pop(self):
+        stats = self.stats
+        start = time.time()
+        item = self.fringe.pop()
+        stats.fringeTime += time.time() - start
+        stats.pops += 1
+        stats.fringeSize -= 1
+        return item
+
+    def isEmpty(self):
+        return self.fringe.isEmpty()
+
+class InstrumentedProblem:
+    """
+    Wraps a search problem and times getSuccessors. Everything else is passed
+    through to the problem.
+    """
+    def __init__(self, problem, stats):
+        self.problem = problem
+        self.stats = stats
+
+    def getSuccessors(self, state):
+        start = time.time()
+        successors = self.problem.getSuccessors(state)
+        self.stats.successorTime += time.time() - start
+        self.stats.successorCalls += 1
+        return successors
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
@@ -202,6 +202,190 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class IndexedPriorityQueue:
+    """
+      Implements a priority queue as a binary heap that also keeps the
+      position of every item inside the heap. Because of that the priority
+      of an item that is already queued can be changed in O(log n)
+      (decrease-key) instead of inserting the same item once more, so the
+      heap never holds more entries than there are distinct items.
+
+      Items must be hashable. Items with equal priority are popped in the
+      order they were (last) given that priority, i.e. ties are FIFO.
+    """
+    def  __init__(self):
+        self.heap = []    # entries are [priority, count, item]
+        self.index = {}   # item -> position of its entry in the heap
+        self.count = 0
+
+    def push(self, item, priority):
+        "Inserts 'item', or lowers its priority if it is already queued"
+        self.update(item, priority)
+
+    def update(self, item, priority):
+        """
+          Decrease-key. If 'item' is not queued it is inserted. If it is
+          queued with a higher priority, its priority is lowered to
+          'priority'. Otherwise nothing happens. Returns True if the queue
+          changed.
+        """
+        pos = self.index.get(item)
+        if pos is not None:
+            entry = self.heap[pos]
+            if entry[0] <= priority:
+                return False
+            entry[0] = priority
+            entry[1] = self.count
+            self.count += 1
+            self._siftUp(pos)
+            return True
+        self.heap.append([priority, self.count, item])
+        self.index[item] = len(self.heap) - 1
+        self.count += 1
+        self._siftUp(len(self.heap) - 1)
+        return True
+
+    def pop(self):
+        "Removes and returns the item with the lowest priority"
+        heap = self.heap
+        last = heap.pop()
+        if heap:
+            top = heap[0]
+            heap[0] = last
+            self.index[last[2]] = 0
+            self._siftDown(0)
+        else:
+            top = last
+        del self.index[top[2]]
+        return top[2]
+
+    def peek(self):
+        "Returns the item with the lowest priority without removing it"
+        return self.heap[0][2]
+
+    def getPriority(self, item):
+        return self.heap[self.index[item]][0]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        "Iterates over the queued items, in no particular order"
+        return iter(self.index)
+
+    def _siftUp(self, pos):
+        heap, index = self.heap, self.index
+        entry = heap[pos]
+        while pos > 0:
+            parentPos = (pos - 1) >> 1
+            parent = heap[parentPos]
+            if (entry[0], entry[1]) >= (parent[0], parent[1]): break
+            heap[pos] = parent
+            index[parent[2]] = pos
+            pos = parentPos
+        heap[pos] = entry
+        index[entry[2]] = pos
+
+    def _siftDown(self, pos):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            childPos = 2 * pos + 1
+            if childPos >= size: break
+            rightPos = childPos + 1
+            if rightPos < size and (heap[rightPos][0], heap[rightPos][1]) < (heap[childPos][0], heap[childPos][1]):
+                childPos = rightPos
+            child = heap[childPos]
+            if (entry[0], entry[1]) <= (child[0], child[1]): break
+            heap[pos] = child
+            index[child[2]] = pos
+            pos = childPos
+        heap[pos] = entry
+        index[entry[2]] = pos
+
+class LRUCache:
+    """
+      A dictionary that holds at most 'capacity' keys. Once full, storing a
+      new key evicts the key that was least recently stored or looked up.
+    """
+    def  __init__(self, capacity):
+        import collections
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        "Returns the value of key (marking it as recently used), or default"
+        entries = self.entries
+        if key not in entries:
+            return default
+        value = entries.pop(key)
+        entries[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        entries = self.entries
+        if key in entries:
+            del entries[key]
+        elif len(entries) >= self.capacity:
+            entries.popitem(last=False)
+        entries[key] = value
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+def mapCacheFile(path, header, fields, length):
+    """
+      Memory-maps the cache file at path read-only. Returns None, so that the
+      caller computes the data again, if the file is missing or unreadable,
+      does not start with header.pack(*fields) or is not 'length' bytes long.
+    """
+    import os, mmap
+    if not os.path.exists(path): return None
+    try:
+        f = open(path, 'rb')
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+    except (IOError, OSError, ValueError):
+        return None
+    if len(mapped) != length or header.unpack_from(mapped, 0) != tuple(fields):
+        mapped.close()
+        return None
+    return mapped
+
+def saveCacheFile(path, header, fields, data):
+    """
+      Writes header.pack(*fields) and data (a string, bytearray or array) to
+      path. Writes to a temporary file first, so readers never see half of it.
+    """
+    import os
+    tmpPath = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        f = open(tmpPath, 'wb')
+        try:
+            f.write(header.pack(*fields))
+            f.write(data)
+        finally:
+            f.close()
+        os.rename(tmpPath, path)
+    except (IOError, OSError):
+        # The cache is only an optimization, a read-only tree still works
+        if os.path.exists(tmpPath): os.remove(tmpPath)
+
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
@@ -13,27 +13,43 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, BitGrid
 import os
 import random
 
 VISIBILITY_MATRIX_CACHE = {}
 
+# Implementations of the walls and food grids a layout can use
+GRID_TYPES = {'lists': Grid, 'bitboard': BitGrid}
+
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    A layout is never changed once it is built: game states (see
+    GameStateData.deepCopy) and the walls they return all share the same one,
+    and its walls and food grids are read-only (see Grid.asReadOnly).
+    The food, capsules and agent positions here are those at the start of a
+    game; game states keep their own copies to change.
+
+    gridType (see GRID_TYPES) picks the implementation of the walls and food
+    grids, which game states played on the layout keep using.
     """
 
-    def __init__(self, layoutText):
+    def __init__(self, layoutText, gridType='lists'):
         self.width = len(layoutText[0])
         self.height= len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.gridType = gridType
+        gridClass = GRID_TYPES[gridType]
+        self.walls = gridClass(self.width, self.height, False)
+        self.food = gridClass(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
-        self.layoutText = layoutText
+        self.walls = self.walls.asReadOnly()
+        self.food = self.food.asReadOnly()
+        self.layoutText = tuple(layoutText)
         self.totalFood = len(self.food.asList())
         # self.initializeVisibilityMatrix()
 
@@ -90,7 +106,8 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        "Layouts are immutable, so a copy is the layout itself."
+        return self
 
     def processLayoutText(self, layoutText):
         """
@@ -128,22 +145,22 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
-def getLayout(name, back = 2):
+def getLayout(name, back = 2, gridType = 'lists'):
     if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
-        if layout == None: layout = tryToLoad(name)
+        layout = tryToLoad('layouts/' + name, gridType)
+        if layout == None: layout = tryToLoad(name, gridType)
     else:
-        layout = tryToLoad('layouts/' + name + '.lay')
-        if layout == None: layout = tryToLoad(name + '.lay')
+        layout = tryToLoad('layouts/' + name + '.lay', gridType)
+        if layout == None: layout = tryToLoad(name + '.lay', gridType)
     if layout == None and back >= 0:
         curdir = os.path.abspath('.')
         os.chdir('..')
-        layout = getLayout(name, back -1)
+        layout = getLayout(name, back -1, gridType)
         os.chdir(curdir)
     return layout
 
-def tryToLoad(fullname):
+def tryToLoad(fullname, gridType = 'lists'):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    try: return Layout([line.strip() for line in f], gridType)
     finally: f.close()
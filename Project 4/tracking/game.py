@@ -21,7 +21,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
-import time, os
+import time, os, hashlib
 import traceback
 import sys
 
@@ -166,6 +166,9 @@ class Grid:
     y vertical and the origin (0,0) in the bottom left corner.
 
     The __str__ method constructs an output that is oriented like a pacman board.
+
+    A read-only grid (see asReadOnly) keeps its columns in tuples, so writes to
+    it raise a TypeError while reads cost the same.
     """
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
         if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
@@ -181,6 +184,7 @@ class Grid:
         return self.data[i]
 
     def __setitem__(self, key, item):
+        if self.isReadOnly(): raise TypeError('This grid is read-only, change a copy of it instead')
         self.data[key] = item
 
     def __str__(self):
@@ -190,31 +194,63 @@ class Grid:
 
     def __eq__(self, other):
         if other == None: return False
+        if isinstance(other, BitGrid): return other == self
+        if type(self.data) is not type(other.data):
+            # A read-only grid and a writable one
+            return [tuple(x) for x in self.data] == [tuple(x) for x in other.data]
         return self.data == other.data
 
     def __hash__(self):
         # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(self.asBitmask())
+
+    def asBitmask(self):
+        """
+        Returns the grid as one integer, whose bit x * height + y is set when
+        grid[x][y] is true. Equal grids of the same size give equal integers.
+        """
+        digits = ['1' if i else '0' for l in reversed(self.data) for i in reversed(l)]
+        if not digits: return 0
+        return int(''.join(digits), 2)
+
+    def getCells(self):
+        """
+        Returns the object that holds the cells, the columns. A read-only grid
+        keeps the same one (see GameStateData._getFoodHash).
+        """
+        return self.data
+
+    def isReadOnly(self):
+        return type(self.data) is tuple
+
+    def asReadOnly(self):
+        """
+        Returns the grid itself if it is read-only, else a read-only copy of
+        it. Read-only grids can be shared, e.g. between game states.
+        """
+        if self.isReadOnly(): return self
+        return _gridWithData(self.width, self.height, tuple([tuple(x) for x in self.data]))
 
     def copy(self):
-        g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
-        return g
+        "Returns a writable copy of the grid."
+        return _gridWithData(self.width, self.height, [list(x) for x in self.data])
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
-        return g
+        return _gridWithData(self.width, self.height, self.data)
+
+    def copyWithValue(self, x, y, value):
+        """
+        Returns a read-only copy of the grid with grid[x][y] set to value.
+        Only column x is copied, the others are shared with this grid (or with
+        its read-only copy, if it is writable).
+        """
+        data = self.asReadOnly().data
+        column = list(data[x])
+        column[y] = value
+        return _gridWithData(self.width, self.height, data[:x] + (tuple(column),) + data[x + 1:])
 
     def count(self, item =True ):
         return sum([x.count(item) for x in self.data])
@@ -274,6 +310,203 @@ class Grid:
                 bools.append(False)
         return bools
 
+def _gridWithData(width, height, data):
+    "Returns a Grid around existing columns, without filling new ones first."
+    g = Grid(0, 0)
+    g.width = width
+    g.height = height
+    g.data = data
+    return g
+
+class BitGrid:
+    """
+    A 2-dimensional array of booleans backed by the bits of one integer, a
+    bitboard: grid[x][y] is bit x * height + y. It has the interface of Grid
+    (grid[x][y] reads and writes, width, height, copy, asList, count,
+    packBits, ...) and is picked per layout (see layout.Layout).
+
+    Counting is a popcount and asList scans the binary digits, instead of
+    Python loops over every cell. The integer is never changed in place, a
+    write makes a new one, so copies share it and cost the same on any board.
+    Reading a cell is slower than with Grid's lists. Writes to a read-only
+    grid (see asReadOnly) raise a TypeError.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.readOnly = False
+        self.bits = 0
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.width:
+            x = _checkIndex(x, self.width)
+        return _BitGridColumn(self, x)
+
+    def __setitem__(self, x, column):
+        x = _checkIndex(x, self.width)
+        for y in range(self.height):
+            self.setValue(x, y, column[y])
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield _BitGridColumn(self, x)
+
+    def getValue(self, x, y):
+        return (self.bits >> (x * self.height + y)) & 1 == 1
+
+    def setValue(self, x, y, value):
+        if self.readOnly: raise TypeError('This grid is read-only, change a copy of it instead')
+        bit = 1 << (x * self.height + y)
+        if value:
+            self.bits |= bit
+        else:
+            self.bits &= ~bit
+
+    def __str__(self):
+        out = [[str(self.getValue(x, y))[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        return self.width == other.width and self.height == other.height and \
+               self.bits == other.asBitmask()
+
+    def __hash__(self):
+        # The same as Grid's for the same cells
+        return hash(self.bits)
+
+    def asBitmask(self):
+        return self.bits
+
+    def getCells(self):
+        "Returns the integer that holds the cells (see Grid.getCells)."
+        return self.bits
+
+    def isReadOnly(self):
+        return self.readOnly
+
+    def asReadOnly(self):
+        "Returns the grid itself if it is read-only, else a read-only copy of it."
+        if self.readOnly: return self
+        return _bitGridWithBits(self.width, self.height, self.bits, True)
+
+    def copy(self):
+        "Returns a writable copy of the grid."
+        return _bitGridWithBits(self.width, self.height, self.bits)
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # Writes to a shallow copy of a Grid show in the original as well,
+        # which for a bitboard means the copy is the grid itself
+        return self
+
+    def copyWithValue(self, x, y, value):
+        "Returns a read-only copy of the grid with grid[x][y] set to value."
+        g = self.copy()
+        g.setValue(x, y, value)
+        g.readOnly = True
+        return g
+
+    def count(self, item =True ):
+        trues = bin(self.bits).count('1')
+        if item: return trues
+        return self.width * self.height - trues
+
+    def asList(self, key = True):
+        bits = self.bits
+        if not key:
+            bits ^= (1 << (self.width * self.height)) - 1
+        return bitPositions(bits, self.height)
+
+    def packBits(self):
+        """
+        Returns the same (width, height, bitPackedInts...) as Grid.packBits
+        """
+        numCells = self.width * self.height
+        size = self.CELLS_PER_INT
+        # Cell i is character i; Grid packs size cells per int, the first
+        # one in the highest bit, and always ends with a partial (or empty) int
+        cells = bin(self.bits)[2:].zfill(numCells)[::-1][:numCells]
+        cells += '0' * ((numCells / size + 1) * size - numCells)
+        packed = [int(cells[i:i + size], 2) for i in range(0, len(cells), size)]
+        return tuple([self.width, self.height] + packed)
+
+    def _unpackBits(self, bits):
+        """
+        Fills in data from a bit-level representation
+        """
+        numCells = self.width * self.height
+        for packed in bits:
+            if packed < 0: raise ValueError, "must be a positive integer"
+        cells = ''.join([bin(packed)[2:].zfill(self.CELLS_PER_INT) for packed in bits])[:numCells]
+        if cells:
+            self.bits = int(cells[::-1], 2)
+
+class _BitGridColumn:
+    "Column x of a BitGrid, so that grid[x][y] reads and writes cells."
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+        self.height = grid.height
+        self.offset = x * grid.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            y = _checkIndex(y, self.height)
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        self.grid.setValue(self.x, _checkIndex(y, self.height), value)
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        bits, offset = self.grid.bits, self.offset
+        for y in range(self.height):
+            yield (bits >> (offset + y)) & 1 == 1
+
+def _checkIndex(i, size):
+    "Returns index i of a sequence of length size, negative ones as for lists."
+    if 0 <= i < size: return i
+    if -size <= i < 0: return i + size
+    raise IndexError('grid index out of range')
+
+def _bitGridWithBits(width, height, bits, readOnly=False):
+    g = BitGrid(0, 0)
+    g.width = width
+    g.height = height
+    g.bits = bits
+    g.readOnly = readOnly
+    return g
+
+def bitPositions(bits, height):
+    """
+    Returns the (x,y) of every bit set in bits, by increasing bit, where bit i
+    is cell (i / height, i % height) as in a BitGrid.
+    """
+    # Reversed binary digits, so digit i is bit i
+    digits = bin(bits)[:1:-1]
+    positions = []
+    i = digits.find('1')
+    while i >= 0:
+        positions.append(divmod(i, height))
+        i = digits.find('1', i + 1)
+    return positions
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -368,6 +601,32 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+# Zobrist hashing: every feature of a state (an agent's configuration and
+# scared timer, a food dot, a capsule) gets a random 63-bit key, and a state
+# hashes to the XOR of the keys of its features. Changing a feature XORs its
+# old key out and its new key in, without looking at the rest of the state.
+_zobristKeys = {}
+
+def zobristKey( feature ):
+    """
+    Returns the random key of a feature, a tuple of strings, numbers and None.
+    Keys are digests of the feature itself, so every process gives a feature
+    the same key, and equal features (e.g. (1, 2) and (1.0, 2.0)) equal keys.
+    """
+    key = _zobristKeys.get(feature)
+    if key == None:
+        digest = hashlib.md5(repr(_canonicalFeature(feature))).hexdigest()
+        key = _zobristKeys[feature] = int(int(digest[:16], 16) >> 1)
+    return key
+
+def _canonicalFeature( value ):
+    # Equal numbers of different types print differently, print them alike
+    if type(value) is tuple:
+        return tuple([_canonicalFeature(v) for v in value])
+    if type(value) in (bool, long) or (type(value) is float and value.is_integer()):
+        return int(value)
+    return value
+
 class GameStateData:
     """
 
@@ -383,6 +642,10 @@ class GameStateData:
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            # States pickled before the food hash existed have no _foodHash
+            self._foodHash = getattr(prevState, '_foodHash', None)
+        else:
+            self._foodHash = None
 
         self._foodEaten = None
         self._foodAdded = None
@@ -394,26 +657,67 @@ class GameStateData:
 
     def deepCopy( self ):
         state = GameStateData( self )
-        state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        # Neither the layout nor the food grid is ever changed in place (the
+        # food is read-only and eaten food makes a new grid, see eatFood), so
+        # both are shared
+        state.food = self.food.asReadOnly()
+        state.layout = self.layout
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
         return state
 
+    def __getstate__( self ):
+        # The food hash is kept with the identity of the food's cells, which
+        # pickling preserves; computed again after unpickling instead
+        state = self.__dict__.copy()
+        state.pop('_foodHash', None)
+        return state
+
     def copyAgentStates( self, agentStates ):
         copiedStates = []
         for agentState in agentStates:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def eatFood( self, x, y ):
+        """
+        Removes the dot at (x,y). The food grid is replaced by a read-only
+        copy without it (food grids are shared between states, see
+        Grid.copyWithValue) and the hash of the food is updated rather than
+        computed again.
+        """
+        food, foodHash = self.food, getattr(self, '_foodHash', None)
+        self.food = food.copyWithValue(x, y, False)
+        if foodHash != None and foodHash[0] is food.getCells():
+            self._foodHash = (self.food.getCells(), foodHash[1] ^ zobristKey(('food', x, y)))
+
+    def _getFoodHash( self ):
+        """
+        Zobrist hash of the food. For a read-only grid it is kept with the
+        cells it was computed for (see Grid.getCells), and computed again only
+        when the grid was replaced by one that eatFood did not make. A
+        writable grid can change in place, so its hash is never kept.
+        """
+        food, foodHash = self.food, getattr(self, '_foodHash', None)
+        if foodHash == None or foodHash[0] is not food.getCells():
+            value = 0
+            for x, y in food.asList():
+                value ^= zobristKey(('food', x, y))
+            if not food.isReadOnly(): return value
+            foodHash = self._foodHash = (food.getCells(), value)
+        return foodHash[1]
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
         """
         if other == None: return False
         # TODO Check for type of other
+        # Different hashes are different states, and hashes are cheap (the
+        # food part is only kept for read-only food, so it is never stale)
+        if hash(self) != hash(other): return False
         if not self.agentStates == other.agentStates: return False
         if not self.food == other.food: return False
         if not self.capsules == other.capsules: return False
@@ -423,14 +727,36 @@ class GameStateData:
     def __hash__( self ):
         """
         Allows states to be keys of dictionaries.
+
+        A Zobrist hash (see zobristKey). The food part, the only one that
+        grows with the board, is kept up to date as dots are eaten (see
+        eatFood); agents and capsules are a few XORs, so hashing a state costs
+        the same on any board.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        h = self._getFoodHash()
+        for index, agentState in enumerate( self.agentStates ):
+            configuration = agentState.configuration
+            if configuration == None:
+                h ^= zobristKey( (index, None, None, agentState.scaredTimer) )
+            else:
+                h ^= zobristKey( (index, configuration.pos, configuration.direction, agentState.scaredTimer) )
+        for capsule in self.capsules:
+            h ^= zobristKey( ('capsule', capsule) )
+        return h ^ ((hash(self.score) * 1000003) & 0x7FFFFFFFFFFFFFFF)
+
+    def explorationKey( self ):
+        """
+        A value that is equal for equal states (see __eq__) but refers to no
+        state objects, so states can be counted without keeping them alive.
+        """
+        agents = []
+        for agentState in self.agentStates:
+            configuration = agentState.configuration
+            if configuration == None:
+                agents.append( (None, None, agentState.scaredTimer) )
+            else:
+                agents.append( (configuration.pos, configuration.direction, agentState.scaredTimer) )
+        return (tuple(agents), self.food.asBitmask(), tuple(self.capsules), self.score)
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -488,7 +814,11 @@ class GameStateData:
         """
         Creates an initial game state from a layout array (see layout.py).
         """
-        self.food = layout.food.copy()
+        # Read-only, so that states can share it
+        self.food = layout.food.asReadOnly()
+        # Hashed once here, successors update it as they eat (see eatFood)
+        self._foodHash = None
+        self._getFoodHash()
         #self.capsules = []
         self.capsules = layout.capsules[:]
         self.layout = layout
@@ -71,14 +71,35 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable keeps track of the distinct states generated while
+    # tracking is on (see trackExplored), as GameStateData.explorationKey
+    # values. None, the default, when tracking is off.
+    explored = None
     def getAndResetExplored():
+        """
+        Returns the states tracked since tracking started or the last call,
+        and starts over. Returns an empty set when tracking is off.
+        """
+        if GameState.explored == None: return set()
         tmp = GameState.explored.copy()
-        GameState.explored = set()
+        GameState.explored.clear()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
+    def trackExplored():
+        """
+        Tracks the distinct states generated inside a with block:
+
+          with GameState.trackExplored() as explored:
+              agent.getAction(state)
+          print len(explored)
+
+        Only keys of the states are kept, never the states themselves, and
+        tracking stops when the block ends. Blocks may be nested.
+        """
+        return _ExploredTracking()
+    trackExplored = staticmethod(trackExplored)
+
     def getLegalActions( self, agentIndex=0 ):
         """
         Returns the legal actions for the agent specified.
@@ -120,8 +141,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored != None:
+            GameState.explored.add(self.data.explorationKey())
+            GameState.explored.add(state.data.explorationKey())
         return state
 
     def getLegalPacmanActions( self ):
@@ -185,6 +207,9 @@ class GameState:
 
         currentFood = state.getFood()
         if currentFood[x][y] == True: ...
+
+        The grid is shared with other states and read-only: changing it
+        raises a TypeError, change a copy (currentFood.copy()) instead.
         """
         return self.data.food
 
@@ -253,6 +278,21 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+class _ExploredTracking:
+    "The with block of GameState.trackExplored."
+    def __enter__( self ):
+        self.outer = GameState.explored
+        GameState.explored = set()
+        return GameState.explored
+
+    def __exit__( self, *excInfo ):
+        explored = GameState.explored
+        GameState.explored = self.outer
+        # States of a nested block were generated in the outer one as well
+        if self.outer != None and explored != None:
+            self.outer.update(explored)
+        return False
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -361,8 +401,7 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.eatFood(x, y)
             state.data._foodEaten = position
             # TODO: cache numFood?
             numFood = state.getNumFood()
@@ -523,6 +562,8 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--gridType', dest='gridType', type='choice', choices=sorted(layout.GRID_TYPES),
+                      help=default('How the layout stores its walls and food: lists or bitboard'), default='lists')
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -533,7 +574,7 @@ def readCommand( argv ):
     if options.fixRandomSeed: random.seed('cs188')
 
     # Choose a layout
-    args['layout'] = layout.getLayout( options.layout )
+    args['layout'] = layout.getLayout( options.layout, gridType=options.gridType )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent